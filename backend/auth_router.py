@@ -1,74 +1,90 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 
-from database import get_db
+from database import DbSession, get_db, run_db
 from models import User
 from schemas import UserCreate, UserLogin, User as UserSchema, Token
 from dependencies import create_access_token, get_current_user
+from passwords import get_password_hash, hash_password_async, verify_password_async
 
 # Token expiration time
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Create auth router with prefix and tags
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def _get_user_credentials(db: Session, email: str):
+    # Plain row, not an ORM instance, so later commits can't expire it
+    return db.query(User.id, User.hashed_password).filter(User.email == email).first()
+
+
+def _user_exists(db: Session, username: str, email: str) -> bool:
+    db_user = db.query(User).filter(
+        (User.username == username) | (User.email == email)
+    ).first()
+    return db_user is not None
+
 
-def get_password_hash(password: str):
-    password = password[:72]   # truncate to bcrypt limit
-    return pwd_context.hash(password)
+def _add_user(db: Session, username: str, email: str, hashed_password: str) -> int:
+    db_user = User(
+        username=username,
+        email=email,
+        hashed_password=hashed_password
+    )
+
+    db.add(db_user)
+    db.commit()
+    return db_user.id
+
+
+def _update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password})
+    db.commit()
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+
+async def authenticate_user(db: DbSession, email: str, password: str):
+    user = await run_db(db, _get_user_credentials, email)
+    if not user:
+        return None
+
+    # bcrypt runs in the password process pool, never on a request thread
+    valid, new_hash = await verify_password_async(password, user.hashed_password)
+    if not valid:
         return None
+
+    # Transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        await run_db(db, _update_password_hash, user.id, new_hash)
     return user
 
 
 @router.post("/register", response_model=Token)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: DbSession = Depends(get_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(
-        (User.username == user.username) | (User.email == user.email)
-    ).first()
-
-    if db_user:
+    if await run_db(db, _user_exists, user.username, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already registered"
         )
 
     # Create new user
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password
-    )
-
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    hashed_password = await hash_password_async(user.password)
+    user_id = await run_db(db, _add_user, user.username, user.email, hashed_password)
 
     # Create access token for the newly registered user
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(db_user.id)}, expires_delta=access_token_expires  # Changed to use user ID
+        data={"sub": str(user_id)}, expires_delta=access_token_expires  # Changed to use user ID
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/login", response_model=Token)
-def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+async def login_user(user_credentials: UserLogin, db: DbSession = Depends(get_db)):
+    user = await authenticate_user(db, user_credentials.email, user_credentials.password)
 
     if not user:
         raise HTTPException(
@@ -87,11 +103,11 @@ def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/logout")
-def logout_user():
+async def logout_user():
     # In a real app, you might blacklist the token here
     return {"message": "Logged out successfully"}
 
 
 @router.get("/me", response_model=UserSchema)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
\ No newline at end of file
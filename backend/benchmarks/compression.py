@@ -0,0 +1,76 @@
+"""CPU cost against bytes saved when compressing typical task list
+responses with the encoders used by compression.py.
+
+Run from the backend directory:
+
+    python -m benchmarks.compression --sizes 10 100 1000 10000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import orjson
+
+from compression import _GzipEncoder, _ZstdEncoder, zstandard
+
+WORDS = "buy call email fix plan review send write update clean book pay read check draft".split()
+
+
+def task_list(size: int) -> bytes:
+    # Shaped like a GET /api/{user_id}/tasks response
+    rng = random.Random(size)
+    now = datetime(2030, 1, 1)
+    return orjson.dumps([
+        {
+            "title": " ".join(rng.choices(WORDS, k=4)).capitalize(),
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 30))) or None,
+            "completed": rng.random() < 0.4,
+            "priority": rng.choice(("low", "medium", "high")),
+            "due_date": now + timedelta(days=rng.randint(0, 90)) if rng.random() < 0.6 else None,
+            "tags": rng.sample(("work", "home", "urgent", "errand", "later"), k=rng.randint(0, 2)),
+            "id": task_id,
+            "owner_id": 1,
+            "created_at": now - timedelta(minutes=task_id),
+            "updated_at": None,
+        }
+        for task_id in range(1, size + 1)
+    ])
+
+
+def measure(make_encoder, payload: bytes, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compressed = make_encoder().finish(payload)
+        best = min(best, time.perf_counter() - start)
+    return best, len(compressed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    encoders = [(f"gzip-{level}", lambda level=level: _GzipEncoder(level)) for level in (1, 6, 9)]
+    if zstandard is not None:
+        encoders += [(f"zstd-{level}", lambda level=level: _ZstdEncoder(level)) for level in (1, 3, 9)]
+    else:
+        print("zstandard not installed; gzip only")
+
+    print(f"{'tasks':>7}{'encoding':>10}{'bytes':>10}{'ratio':>8}{'ms':>9}{'MB/s':>9}{'us/KB saved':>13}")
+    for size in args.sizes:
+        payload = task_list(size)
+        print(f"{size:>7}{'identity':>10}{len(payload):>10}")
+        for name, make_encoder in encoders:
+            seconds, compressed = measure(make_encoder, payload, args.repeat)
+            saved_kb = (len(payload) - compressed) / 1024
+            print(
+                f"{'':>7}{name:>10}{compressed:>10}{len(payload) / compressed:>7.1f}x{seconds * 1e3:>9.2f}"
+                f"{len(payload) / seconds / 1e6:>9.0f}{seconds * 1e6 / saved_kb if saved_kb > 0 else float('inf'):>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Time to build a GET /api/{user_id}/tasks response body: ORM objects
+validated row by row through the Task schema versus the column-row path in
+tasks_router.py encoded with orjson.
+
+Run from the backend directory:
+
+    python -m benchmarks.list_serialization --sizes 1000 10000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from migrations import run_migrations
+from models import Task, TaskTag, User
+from schemas import Task as TaskSchema, TaskListParams
+from tasks_router import _list_tasks
+
+TASK_LIST = TypeAdapter(list[TaskSchema])
+
+
+def seed(Session, tasks: int):
+    engine = Session.kw["bind"]
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": 1, "username": "bench", "email": "bench@example.com", "hashed_password": "x"}
+        ])
+        conn.execute(Task.__table__.insert(), [
+            {
+                "id": n,
+                "title": f"Task {n}",
+                "description": "lorem ipsum " * 10,
+                "completed": n % 3 == 0,
+                "priority": ("low", "medium", "high")[n % 3],
+                "due_date": datetime(2030, 1, 1) + timedelta(days=n % 365),
+                "owner_id": 1,
+            }
+            for n in range(1, tasks + 1)
+        ])
+        conn.execute(TaskTag.__table__.insert(), [
+            {"task_id": n, "tag": tag, "owner_id": 1, "position": position}
+            for n in range(1, tasks + 1)
+            for position, tag in enumerate(("work", f"tag{n % 7}"))
+        ])
+
+
+def orm_path(Session) -> bytes:
+    # What get_tasks did before: ORM rows, per-row validation, then FastAPI's
+    # response_model validation and jsonable_encoder + json.dumps
+    db = Session()
+    try:
+        tasks = [TaskSchema.model_validate(task) for task in db.query(Task).filter(Task.owner_id == 1).order_by(Task.id)]
+        return json.dumps(jsonable_encoder(TASK_LIST.validate_python(tasks))).encode()
+    finally:
+        db.close()
+
+
+def fast_path(Session) -> bytes:
+    db = Session()
+    try:
+        tasks, _ = _list_tasks(db, 1, TaskListParams())
+        return orjson.dumps(tasks)
+    finally:
+        db.close()
+
+
+def best_of(fn, Session, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(Session)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8}{'orm ms':>10}{'fast ms':>10}{'speedup':>10}{'bytes':>10}")
+    for size in args.sizes:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        seed(Session, size)
+
+        assert json.loads(orm_path(Session)) == json.loads(fast_path(Session))
+        orm = best_of(orm_path, Session, args.repeat)
+        fast = best_of(fast_path, Session, args.repeat)
+        print(f"{size:>8}{orm * 1e3:>10.1f}{fast * 1e3:>10.1f}{orm / fast:>9.1f}x{len(fast_path(Session)):>10}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
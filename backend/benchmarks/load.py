@@ -0,0 +1,223 @@
+"""In-process load test: seeds N users x M tasks into a scratch SQLite
+database and drives the real app concurrently through httpx's ASGI
+transport, reporting throughput and p50/p95/p99 latency per endpoint.
+
+Run from the backend directory:
+
+    python -m benchmarks.load --users 20 --tasks 500 --concurrency 32 --requests 5000 \\
+        --output results/load.json --baseline results/previous.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+WORDS = "buy call email fix plan review send write update clean book pay read check draft".split()
+TAGS = ("work", "home", "urgent", "errand", "later", "health", "money")
+
+# (label, weight, method, path template, query params); {task_id} is one of
+# the user's seeded tasks
+SCENARIOS = [
+    ("list page", 20, "GET", "/api/{user_id}/tasks", {"limit": 50}),
+    ("list all", 5, "GET", "/api/{user_id}/tasks", {}),
+    ("list filtered", 10, "GET", "/api/{user_id}/tasks", {"completed": "false", "priority": "high", "limit": 50}),
+    ("list sorted", 5, "GET", "/api/{user_id}/tasks", {"sort": "due_date", "limit": 50}),
+    ("list fields", 5, "GET", "/api/{user_id}/tasks", {"fields": "title,completed,priority,due_date", "limit": 50}),
+    ("search", 10, "GET", "/api/{user_id}/tasks", {"search": "review", "limit": 20}),
+    ("detail", 15, "GET", "/api/{user_id}/tasks/{task_id}", {}),
+    ("stats", 5, "GET", "/api/{user_id}/tasks/stats", {}),
+    ("changes", 5, "GET", "/api/{user_id}/tasks/changes", {"since": 0}),
+    ("create", 8, "POST", "/api/{user_id}/tasks", {}),
+    ("update", 6, "PUT", "/api/{user_id}/tasks/{task_id}", {}),
+    ("toggle", 6, "PATCH", "/api/{user_id}/tasks/{task_id}/toggle", {}),
+]
+
+
+def seed(engine, users: int, tasks_per_user: int, rng: random.Random) -> dict:
+    from database import Base
+    from migrations import run_migrations
+    from models import Task, TaskTag, User
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    task_ids = {}
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": user_id, "username": f"load{user_id}", "email": f"load{user_id}@example.com", "hashed_password": "x"}
+            for user_id in range(1, users + 1)
+        ])
+        task_rows, tag_rows = [], []
+        task_id = 0
+        for user_id in range(1, users + 1):
+            task_ids[user_id] = []
+            for _ in range(tasks_per_user):
+                task_id += 1
+                task_ids[user_id].append(task_id)
+                task_rows.append({
+                    "id": task_id,
+                    "title": " ".join(rng.choices(WORDS, k=4)).capitalize(),
+                    "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 40))) or None,
+                    "completed": rng.random() < 0.4,
+                    "priority": rng.choice(("low", "medium", "high")),
+                    "due_date": now + timedelta(days=rng.randint(-30, 90)) if rng.random() < 0.6 else None,
+                    "owner_id": user_id,
+                })
+                for position, tag in enumerate(rng.sample(TAGS, k=rng.randint(0, 3))):
+                    tag_rows.append({"task_id": task_id, "tag": tag, "owner_id": user_id, "position": position})
+        conn.execute(Task.__table__.insert(), task_rows)
+        if tag_rows:
+            conn.execute(TaskTag.__table__.insert(), tag_rows)
+    return task_ids
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+async def drive(app, tokens: dict, task_ids: dict, args, rng: random.Random) -> tuple:
+    import httpx
+
+    import database
+
+    weights = [scenario[1] for scenario in SCENARIOS]
+    latencies = {label: [] for label, *_ in SCENARIOS}
+    errors = {label: 0 for label, *_ in SCENARIOS}
+    remaining = args.requests
+
+    async def worker(client):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            label, _, method, template, params = rng.choices(SCENARIOS, weights)[0]
+            user_id = rng.choice(list(tokens))
+            path = template.format(user_id=user_id, task_id=rng.choice(task_ids[user_id]))
+            body = None
+            if method in ("POST", "PUT"):
+                body = {"title": " ".join(rng.choices(WORDS, k=3)), "tags": rng.sample(TAGS, k=2)}
+            start = time.perf_counter()
+            response = await client.request(
+                method, path, params=params, json=body,
+                headers={"Authorization": f"Bearer {tokens[user_id]}", "Accept-Encoding": args.accept_encoding}
+            )
+            latencies[label].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors[label] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    # The ASGI transport skips the app's lifespan, so close the pooled
+    # aiosqlite connections here; their threads would keep the process alive
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    return latencies, errors, elapsed
+
+
+def summarize(latencies: dict, errors: dict, elapsed: float) -> dict:
+    endpoints = {}
+    for label, values in latencies.items():
+        if not values:
+            continue
+        values = sorted(values)
+        endpoints[label] = {
+            "requests": len(values),
+            "errors": errors[label],
+            "throughput": len(values) / elapsed,
+            "mean_ms": sum(values) / len(values) * 1e3,
+            "p50_ms": percentile(values, 0.50) * 1e3,
+            "p95_ms": percentile(values, 0.95) * 1e3,
+            "p99_ms": percentile(values, 0.99) * 1e3,
+            "max_ms": values[-1] * 1e3,
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "endpoints": endpoints,
+        "total": {"requests": total, "errors": sum(errors.values()), "seconds": elapsed, "throughput": total / elapsed},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict, baseline: dict = None):
+    header = f"{'endpoint':<15}{'reqs':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header + (f"{'p95 vs base':>13}" if baseline else ""))
+    for label, stats in results["endpoints"].items():
+        line = (
+            f"{label:<15}{stats['requests']:>7}{stats['errors']:>5}{stats['throughput']:>9.1f}"
+            f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+        )
+        previous = (baseline or {}).get("endpoints", {}).get(label)
+        if previous:
+            line += f"{(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:>+12.1f}%"
+        print(line)
+    total = results["total"]
+    print(f"total {total['requests']} requests in {total['seconds']:.2f}s: {total['throughput']:.1f} req/s, {total['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=500, help="tasks per user")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--accept-encoding", default="identity")
+    parser.add_argument("--async-db", action="store_true", help="serve through the aiosqlite engine (DB_ASYNC)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="earlier --output to compare p95 against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # database.py reads its configuration at import time
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(directory) / 'load.db'}"
+        os.environ["DB_ASYNC"] = "true" if args.async_db else "false"
+
+        from database import engine
+        from dependencies import create_access_token
+        from main import app
+
+        rng = random.Random(args.seed)
+        task_ids = seed(engine, args.users, args.tasks, rng)
+        tokens = {user_id: create_access_token({"sub": str(user_id)}) for user_id in task_ids}
+
+        latencies, errors, elapsed = asyncio.run(drive(app, tokens, task_ids, args, rng))
+        engine.dispose()
+
+    results = summarize(latencies, errors, elapsed)
+    results["meta"] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+    }
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(results, baseline)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
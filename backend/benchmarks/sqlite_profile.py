@@ -0,0 +1,113 @@
+"""Mixed read/write throughput of the SQLite engine with and without the
+connection profile from database.py (WAL, synchronous=NORMAL, mmap, cache,
+busy_timeout, explicit pool).
+
+Run from the backend directory:
+
+    python -m benchmarks.sqlite_profile --threads 8 --seconds 5
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, build_engine
+from migrations import run_migrations
+from models import Task, User
+
+
+def seed(engine, users: int, tasks_per_user: int):
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com", "hashed_password": "x"}
+            for user_id in range(1, users + 1)
+        ])
+        conn.execute(Task.__table__.insert(), [
+            {
+                "title": f"Task {n} for user {user_id}",
+                "description": "lorem ipsum " * 20,
+                "completed": n % 3 == 0,
+                "priority": ("low", "medium", "high")[n % 3],
+                "owner_id": user_id,
+            }
+            for user_id in range(1, users + 1)
+            for n in range(tasks_per_user)
+        ])
+
+
+def worker(Session, users, task_count, write_ratio, deadline, counts, lock):
+    reads = writes = errors = 0
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        owner_id = rng.randint(1, users)
+        db = Session()
+        try:
+            if rng.random() < write_ratio:
+                db.add(Task(title="New task", priority="medium", owner_id=owner_id))
+                db.query(Task).filter(Task.id == rng.randint(1, task_count)).update(
+                    {Task.completed: True}, synchronize_session=False
+                )
+                db.commit()
+                writes += 1
+            else:
+                db.query(Task).filter(Task.owner_id == owner_id).order_by(Task.id).limit(50).all()
+                reads += 1
+        except OperationalError:
+            # "database is locked" once a writer gives up waiting
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    with lock:
+        counts["reads"] += reads
+        counts["writes"] += writes
+        counts["errors"] += errors
+
+
+def run(profile: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = build_engine(f"sqlite:///{Path(directory) / 'bench.db'}", profile=profile)
+        seed(engine, args.users, args.tasks)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=worker, args=(Session, args.users, args.users * args.tasks, args.write_ratio, deadline, counts, lock))
+            for _ in range(args.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    counts["ops_per_second"] = (counts["reads"] + counts["writes"]) / args.seconds
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=500, help="tasks per user")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'ops/s':>10}{'reads':>10}{'writes':>10}{'errors':>10}")
+    for label, profile in (("default", False), ("tuned", True)):
+        result = run(profile, args)
+        print(f"{label:<10}{result['ops_per_second']:>10.0f}{result['reads']:>10}{result['writes']:>10}{result['errors']:>10}")
+
+
+if __name__ == "__main__":
+    main()
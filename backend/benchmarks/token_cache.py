@@ -0,0 +1,51 @@
+"""Per-request JWT verification cost with and without the verified-token
+cache in dependencies.py.
+
+Run from the backend directory:
+
+    python -m benchmarks.token_cache --requests 20000 --clients 100
+"""
+import argparse
+import random
+import time
+
+from fastapi import HTTPException
+
+from dependencies import create_access_token, token_cache, verify_token
+
+
+def run(tokens, requests: int, cached: bool) -> float:
+    unauthorized = HTTPException(status_code=401)
+    rng = random.Random(0)
+    token_cache.clear()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        if not cached:
+            token_cache.clear()
+        verify_token(rng.choice(tokens), unauthorized)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=100, help="distinct tokens in rotation")
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": str(user_id)}) for user_id in range(1, args.clients + 1)]
+
+    uncached = run(tokens, args.requests, cached=False)
+    before = token_cache.stats()
+    cached = run(tokens, args.requests, cached=True)
+    after = token_cache.stats()
+    hits = after["hits"] - before["hits"]
+
+    print(f"{'mode':<10}{'us/request':>12}")
+    print(f"{'uncached':<10}{uncached * 1e6:>12.1f}")
+    print(f"{'cached':<10}{cached * 1e6:>12.1f}")
+    print(f"speedup {uncached / cached:.1f}x, hit rate {hits / args.requests:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import zstandard
+except ImportError:  # Optional: gzip only
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Bodies of these types are already compressed; recompressing wastes CPU
+_INCOMPRESSIBLE_TYPES = ("image/", "video/", "audio/", "font/woff", "application/zip", "application/gzip", "application/zstd")
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits 31: gzip container rather than a raw zlib stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        # Sync flush: a streaming client can decode every chunk on arrival
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, chunk: bytes = b"") -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, chunk: bytes = b"") -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush()
+
+
+def negotiate_encoding(accept_encoding: str, zstd_available: bool = None) -> str:
+    # Best encoding the client accepts: zstd, then gzip, else None (identity)
+    if zstd_available is None:
+        zstd_available = zstandard is not None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = quality
+
+    wildcard = weights.get("*", 0.0)
+    candidates = (["zstd"] if zstd_available else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = weights.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compresses response bodies with zstd or gzip, per Accept-Encoding.
+
+    A single-message body is only compressed from minimum_size bytes up.
+    Streaming bodies (several messages) are compressed chunk by chunk and
+    flushed after each one, so server-sent events still arrive promptly.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 gzip_level: int = COMPRESSION_GZIP_LEVEL, zstd_level: int = COMPRESSION_ZSTD_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send, encoding: str, options: CompressionMiddleware):
+        self._send = send
+        self.encoding = encoding
+        self.options = options
+        self.start_message = None
+        self.encoder = None
+        self.passthrough = False
+
+    def _new_encoder(self):
+        if self.encoding == "zstd":
+            return _ZstdEncoder(self.options.zstd_level)
+        return _GzipEncoder(self.options.gzip_level)
+
+    async def send(self, message):
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            # Hold the headers back until the first body chunk shows whether
+            # the response is worth compressing
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers or content_type.startswith(_INCOMPRESSIBLE_TYPES) \
+                    or message["status"] in (204, 304) or message["status"] < 200:
+                self.passthrough = True
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body and len(body) < self.options.minimum_size:
+                # Tiny single-message body: not worth the CPU or the header
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.encoder = self._new_encoder()
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                # Streaming: the compressed length isn't known up front
+                del headers["Content-Length"]
+                await self._send(self.start_message)
+            else:
+                compressed = self.encoder.finish(body)
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+        if more_body:
+            chunk = self.encoder.compress(body) if body else b""
+        else:
+            chunk = self.encoder.finish(body)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
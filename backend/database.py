@@ -1,27 +1,150 @@
-from sqlalchemy import create_engine
+import os
+from typing import Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from metrics import timed_pool
 from sqlalchemy.exc import OperationalError
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./todoapp.db"
 
-# Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+# Database URL (SQLite file by default)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./todoapp.db")
+
+# Serve requests from an async engine (aiosqlite) instead of Starlette's
+# threadpool when DB_ASYNC is set
+ASYNC_DATABASE = _env_flag("DB_ASYNC", "false")
+
+# Connection pool sizing (file-backed and server databases)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# SQLite connection profile, applied to every new connection. WAL lets
+# readers run alongside a writer; synchronous=NORMAL is durable across
+# application crashes under WAL and skips most fsyncs; mmap and a larger
+# page cache keep hot pages out of read() syscalls; busy_timeout makes
+# writers wait for the lock instead of failing with "database is locked".
+# Set DB_SQLITE_PROFILE=false to fall back to SQLite's defaults.
+SQLITE_PROFILE = _env_flag("DB_SQLITE_PROFILE", "true")
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("DB_CACHE_SIZE_KIB", "65536")),  # negative means KiB
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+
+def _is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url) -> bool:
+    url = make_url(url)
+    return _is_sqlite(url) and url.database in (None, "", ":memory:")
+
+
+def apply_sqlite_profile(sync_engine, pragmas: dict = SQLITE_PRAGMAS):
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def _engine_options(url, poolclass) -> dict:
+    options = {}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}  # Needed for SQLite
+    if not _is_memory_sqlite(url):
+        # Explicit pool; in-memory SQLite keeps SQLAlchemy's single-connection pool
+        options.update(
+            poolclass=poolclass,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+    return options
+
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: bool = SQLITE_PROFILE):
+    db_engine = create_engine(url, **_engine_options(url, timed_pool(QueuePool)))
+    if profile and _is_sqlite(url):
+        apply_sqlite_profile(db_engine)
+    return db_engine
+
+
+def build_async_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: bool = SQLITE_PROFILE):
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    db_engine = create_async_engine(url, **_engine_options(url, timed_pool(AsyncAdaptedQueuePool)))
+    if profile and _is_sqlite(url):
+        apply_sqlite_profile(db_engine.sync_engine)
+    return db_engine
+
+
+# Create engine (always available; migrations and scripts use it)
+engine = build_engine()
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory, only created in async mode
+async_engine = build_async_engine() if ASYNC_DATABASE else None
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False) if ASYNC_DATABASE else None
+
 # Base class for models
 Base = declarative_base()
 
+# Either kind of session a request can be handed
+DbSession = Union[Session, AsyncSession]
+
+
 # Dependency to get DB session
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+get_db = get_async_db if ASYNC_DATABASE else get_sync_db
+
+
+async def run_db(db: DbSession, fn, *args, **kwargs):
+    # Run fn(session, *args) against either kind of session. Async sessions
+    # run it on the event loop via run_sync, so the request never holds a
+    # threadpool slot; sync sessions keep using the threadpool.
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def close_db(db: DbSession):
+    # For streaming responses: dependencies close the session before the
+    # body is sent, so a stream that keeps querying reopens it and must
+    # close it again when done
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import hashlib
+import logging
+import time
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 import os
 
-from database import get_db
+from cache import TTLCache
+from database import DbSession, get_db, run_db
+from logs import RateLimitFilter
 from models import User
-from schemas import TokenData
+from schemas import TokenData, User as UserSchema
 
 # Secret key for JWT encoding/decoding (should be stored in environment variables in production)
 SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
@@ -16,6 +22,39 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Browsers' EventSource can't send an Authorization header, so the event
+# stream also accepts a token in its URL. Those tokens carry this scope,
+# are only accepted there, and expire quickly since URLs end up in logs.
+EVENT_STREAM_SCOPE = "events"
+EVENT_STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("EVENT_STREAM_TOKEN_EXPIRE_SECONDS", "60"))
+
+# Failed authentications are logged, but a flood of bad tokens must not turn
+# into a flood of log writes
+logger = logging.getLogger(__name__)
+logger.addFilter(RateLimitFilter())
+
+# Authenticated users by id, so most requests skip the users lookup. Entries
+# are snapshots (no password hash) and are dropped whenever the user row is
+# updated or deleted; the TTL bounds staleness from any other writer.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+user_cache = TTLCache(max_size=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+# Decoded claims of recently verified tokens, keyed by a digest of the token
+# so raw tokens are never held. Repeat requests with the same token skip the
+# HMAC check and claim parsing; an entry never outlives the token's exp.
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", str(ACCESS_TOKEN_EXPIRE_MINUTES * 60)))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+token_cache = TTLCache(max_size=TOKEN_CACHE_MAX_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -29,25 +68,50 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def verify_token(token: str, credentials_exception):
-    try:
-        # Decode the token
+def create_event_stream_token(user_id: int) -> str:
+    return create_access_token(
+        data={"sub": str(user_id), "scope": EVENT_STREAM_SCOPE},
+        expires_delta=timedelta(seconds=EVENT_STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+
+
+def _decode_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Only tokens that expire are cached, and only until they do
+        expires_at = payload.get("exp")
+        if isinstance(expires_at, (int, float)):
+            token_cache.set(key, payload, ttl=expires_at - time.time())
+    return payload
+
+
+def verify_token(token: str, credentials_exception, scope: Optional[str] = None):
+    try:
+        # Decode the token (cached after the first successful verification)
+        payload = _decode_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
-            print("No user ID in token payload")  # Debugging
+            logger.warning("Token has no subject")
+            raise credentials_exception
+        # Access tokens have no scope; scoped tokens only work where asked for
+        if payload.get("scope") != scope:
+            logger.warning("Token has the wrong scope", extra={"scope": str(payload.get("scope"))[:64]})
             raise credentials_exception
         token_data = TokenData(user_id=user_id)
     except JWTError as e:
-        print(f"JWT Error: {e}")  # Debugging
+        logger.warning("Token rejected", extra={"reason": str(e)})
         raise credentials_exception
     return token_data
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
+def _get_user_by_id(db: Session, user_id: int):
+    user = db.query(User).filter(User.id == user_id).first()
+    return UserSchema.model_validate(user) if user else None
+
+
+async def _authenticate(token: str, db: DbSession, scope: Optional[str] = None):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -55,33 +119,55 @@ def get_current_user(
     )
 
     try:
-        print(f"Received token: {credentials.credentials[:20] if len(credentials.credentials) > 20 else credentials.credentials}...")  # Debugging
-        token_data = verify_token(credentials.credentials, credentials_exception)
-        print(f"Token data user ID: {token_data.user_id}")  # Updated to use new field
-        
+        token_data = verify_token(token, credentials_exception, scope)
+
         # Convert the user_id field to integer
         try:
             user_id = int(token_data.user_id)
         except ValueError:
-            print(f"Invalid user ID in token: {token_data.user_id}")  # Debugging
+            logger.warning("Token subject is not a user id", extra={"subject": token_data.user_id[:64]})
             raise credentials_exception
 
-        # Query for the user by ID
-        user_query = db.query(User).filter(User.id == user_id)
-        user = user_query.first()
-        
-        print(f"Query result: {user.username if user else 'None'}")  # Debugging
-        
+        # Query for the user by ID, unless it is cached
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await run_db(db, _get_user_by_id, user_id)
+            if user is not None:
+                user_cache.set(user_id, user)
+
         if user is None:
-            # Log all user IDs in the database for debugging
-            all_users = db.query(User.id).all()
-            print(f"All user IDs in DB: {[u[0] for u in all_users]}")  # Debugging
+            logger.warning("Token subject does not exist", extra={"user_id": user_id})
             raise credentials_exception
-            
+
         return user
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
-    except Exception as e:
-        print(f"Unexpected error in get_current_user: {str(e)}")  # Debugging
-        raise credentials_exception
\ No newline at end of file
+    except Exception:
+        logger.exception("Unexpected error authenticating request")
+        raise credentials_exception
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: DbSession = Depends(get_db)
+):
+    return await _authenticate(credentials.credentials, db)
+
+
+async def get_event_stream_user(
+    token: Optional[str] = Query(None, description="Event stream token, for clients that can't send headers"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: DbSession = Depends(get_db)
+):
+    # An Authorization header (fetch-based clients) or an event stream
+    # token from POST /tasks/events/token in the URL (EventSource)
+    if credentials is not None:
+        return await _authenticate(credentials.credentials, db)
+    if token is not None:
+        return await _authenticate(token, db, scope=EVENT_STREAM_SCOPE)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
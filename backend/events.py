@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+
+# Server-Sent Events for task changes. The broker lives in this process, so
+# with several workers a client only hears about writes served by its own
+# worker; it should still resync through /tasks/changes after reconnecting.
+EVENT_STREAM_MAX_CONNECTIONS = int(os.getenv("EVENT_STREAM_MAX_CONNECTIONS", "1000"))
+EVENT_STREAM_MAX_PER_USER = int(os.getenv("EVENT_STREAM_MAX_PER_USER", "10"))
+EVENT_STREAM_BUFFER_SIZE = int(os.getenv("EVENT_STREAM_BUFFER_SIZE", "100"))
+EVENT_STREAM_HEARTBEAT_SECONDS = float(os.getenv("EVENT_STREAM_HEARTBEAT_SECONDS", "15"))
+
+# Queued in place of events once a subscriber falls too far behind, or when
+# the server shuts down
+_RESYNC = None
+_CLOSE = object()
+
+
+class TaskEventBroker:
+    """Fans task events out to each user's open event streams.
+
+    Every subscriber has a bounded queue. A subscriber that lets it fill up
+    is told to resync and dropped, so one slow client never holds events
+    back from the others or grows memory without bound. Only call it from
+    the event loop.
+    """
+
+    def __init__(self, max_connections: int, max_per_user: int, buffer_size: int):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.buffer_size = buffer_size
+        self._subscribers = {}  # user_id -> set of queues
+        self.connections = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queues = self._subscribers.setdefault(user_id, set())
+        if self.connections >= self.max_connections or len(queues) >= self.max_per_user:
+            if not queues:
+                del self._subscribers[user_id]
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many open event streams",
+                headers={"Retry-After": "5"},
+            )
+        queue = asyncio.Queue(maxsize=self.buffer_size)
+        queues.add(queue)
+        self.connections += 1
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        self.connections -= 1
+        if not queues:
+            del self._subscribers[user_id]
+
+    def publish(self, user_id: int, event: str, data):
+        message = (event, jsonable_encoder(data))
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._overflow(user_id, queue)
+
+    def _overflow(self, user_id: int, queue: asyncio.Queue):
+        # Replace the backlog with a single resync marker
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_RESYNC)
+        self.unsubscribe(user_id, queue)
+        self.dropped += 1
+
+    def close_all(self):
+        for user_id, queues in list(self._subscribers.items()):
+            for queue in list(queues):
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_CLOSE)
+                self.unsubscribe(user_id, queue)
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(broker: TaskEventBroker, user_id: int, queue: asyncio.Queue, heartbeat: float):
+    try:
+        # Ask EventSource clients to wait 3s before reconnecting
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from timing out idle streams
+                yield ": keep-alive\n\n"
+                continue
+            if message is _CLOSE:
+                return
+            if message is _RESYNC:
+                yield format_event("resync", {"detail": "Too many pending events, fetch changes and reconnect"})
+                return
+            yield format_event(*message)
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+broker = TaskEventBroker(
+    max_connections=EVENT_STREAM_MAX_CONNECTIONS,
+    max_per_user=EVENT_STREAM_MAX_PER_USER,
+    buffer_size=EVENT_STREAM_BUFFER_SIZE,
+)
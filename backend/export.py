@@ -0,0 +1,63 @@
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+
+import orjson
+
+# Rows fetched from the database cursor (and encoded) at a time
+EXPORT_BATCH_SIZE = int(os.getenv("TASK_EXPORT_BATCH_SIZE", "500"))
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        # Tags, as a JSON array: tags may themselves contain commas
+        return orjson.dumps(value).decode()
+    return value
+
+
+def encode_ndjson(tasks: list[dict]) -> bytes:
+    return b"".join(orjson.dumps(task) + b"\n" for task in tasks)
+
+
+def encode_csv(rows: list[list]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+    return buffer.getvalue().encode()
+
+
+async def export_stream(batches, export_format: str, fields: tuple, compress: bool = False):
+    # Encodes each batch of task dicts as it arrives, so only one batch is
+    # ever held in memory; compress=True produces a .gz file
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def output(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    try:
+        if export_format == "csv":
+            yield output(encode_csv([fields]))
+        async for tasks in batches:
+            if export_format == "csv":
+                chunk = encode_csv([[task[field] for field in fields] for task in tasks])
+            else:
+                chunk = encode_ndjson(tasks)
+            chunk = output(chunk)
+            if chunk:
+                yield chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        # Release the cursor now if the client went away mid-export
+        await batches.aclose()
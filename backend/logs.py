@@ -0,0 +1,95 @@
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Records let through per message per window; the rest are counted and dropped
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "10"))
+LOG_RATE_WINDOW_SECONDS = float(os.getenv("LOG_RATE_WINDOW_SECONDS", "60"))
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra= fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Like QueueHandler, render the message and traceback before the
+        # record changes threads, but keep the traceback out of the message
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `limit` records per message template through in each
+    window, so a flood of identical failures costs a counter bump rather
+    than a write. The first record of the next window carries the number
+    that were dropped."""
+
+    def __init__(self, limit: int = LOG_RATE_LIMIT, window: float = LOG_RATE_WINDOW_SECONDS):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        # (logger, template) -> [window start, let through, dropped]. Keyed
+        # by template, not the formatted message, so it stays small. Races
+        # between threads only make the counts approximate, so no lock.
+        self._windows = {}
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        state = self._windows.get(key)
+        if state is None or now - state[0] >= self.window:
+            if state is not None and state[2]:
+                record.suppressed = state[2]
+            state = self._windows[key] = [now, 0, 0]
+        if state[1] >= self.limit:
+            state[2] += 1
+            return False
+        state[1] += 1
+        return True
+
+
+def configure_logging(level: str = LOG_LEVEL) -> QueueListener:
+    # Request handlers only put records on a queue; the returned listener's
+    # thread formats and writes them. Start it on startup, stop it (which
+    # flushes the queue) on shutdown.
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.setLevel(level)
+    handler = _QueueHandler(log_queue)
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    return QueueListener(log_queue, stream, respect_handler_level=True)
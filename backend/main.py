@@ -1,19 +1,86 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
 
-from database import engine, Base
+import database
+from compression import CompressionMiddleware
+from database import engine, Base, SessionLocal
+from dependencies import token_cache, user_cache
+from events import broker
+from logs import configure_logging
+from metrics import MetricsMiddleware, render
+from migrations import run_migrations
+from passwords import shutdown_pool
+from profiler import DB_REQUEST_QUERY_BUDGET, QueryProfileMiddleware
+from versions import TOMBSTONE_COMPACT_INTERVAL, compact_tombstones
 
 from auth_router import router as auth_router
 from tasks_router import router as tasks_router
 
-# Create all tables if they don't exist
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+log_listener = configure_logging()
+
+
+def _prepare_database():
+    # Create all tables if they don't exist, then bring older databases up
+    # to date. Run on startup rather than at import, so importing the app
+    # (tests, scripts) never touches the configured database.
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+def _compact_tombstones():
+    db = SessionLocal()
+    try:
+        compact_tombstones(db)
+    finally:
+        db.close()
+
+
+async def _compact_tombstones_periodically():
+    while True:
+        try:
+            await run_in_threadpool(_compact_tombstones)
+        except Exception:
+            logger.exception("Tombstone compaction failed")
+        await asyncio.sleep(TOMBSTONE_COMPACT_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    await run_in_threadpool(_prepare_database)
+    compaction = None
+    if TOMBSTONE_COMPACT_INTERVAL > 0:
+        compaction = asyncio.create_task(_compact_tombstones_periodically())
+    yield
+    if compaction:
+        compaction.cancel()
+    # End open event streams so shutdown doesn't wait on them
+    broker.close_all()
+    # Stop the bcrypt worker processes
+    shutdown_pool()
+    # Close pooled connections; each aiosqlite one holds a non-daemon
+    # thread that would keep the process alive
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    engine.dispose()
+    # Write out queued log records
+    log_listener.stop()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Todo App Backend",
     description="A Todo application backend with JWT authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware with specific origins for security
@@ -36,10 +103,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Next-Cursor", "ETag"],  # Pagination cursor and task list versions
     # Allow specific headers that might be sent by frontend
     allow_origin_regex=r"https?://localhost(:[0-9]+)?|https?://127\.0\.0\.1(:[0-9]+)?"
 )
 
+# Compress large responses
+app.add_middleware(CompressionMiddleware)
+
+# Log requests that run more statements than budgeted
+if DB_REQUEST_QUERY_BUDGET > 0:
+    app.add_middleware(QueryProfileMiddleware)
+
+# Request metrics (outermost, so latency includes every other middleware)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(tasks_router)
@@ -50,11 +128,35 @@ def read_root():
     return {"message": "Welcome to the Todo App Backend!"}
 
 
+def _check_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
 @app.get("/health", tags=["default"])
-def health_check():
+async def health_check():
+    try:
+        await run_in_threadpool(_check_database)
+    except Exception:
+        logger.exception("Health check failed")
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "message": "Database unavailable"}
+        )
     return {"status": "healthy", "message": "Service is operational"}
 
 
+@app.get("/metrics", tags=["default"], response_class=PlainTextResponse)
+def get_metrics():
+    pools = {"sync": engine.pool}
+    if database.async_engine is not None:
+        pools["async"] = database.async_engine.sync_engine.pool
+    return PlainTextResponse(
+        render(pools=pools, caches={"user": user_cache, "token": token_cache}),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 # For running the application directly
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,239 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus metrics without a client library. Request-level metrics are
+# only ever updated from the event loop, so they need no locks: database
+# work done in worker threads is added up per request (through a context
+# variable, which run_in_threadpool carries over) and recorded by the
+# middleware once the request finishes.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "pool_waits")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.pool_waits = []
+
+
+_request_stats: ContextVar = ContextVar("request_stats", default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.request_duration = {}  # (method, route, status) -> Histogram
+        self.request_queries = {}  # route -> Histogram
+        self.request_query_seconds = {}  # route -> Histogram
+        self.pool_wait = Histogram(POOL_WAIT_BUCKETS)
+        self.queries_total = 0
+        self.query_seconds_total = 0.0
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route, str(status))
+        histogram = self.request_duration.get(key)
+        if histogram is None:
+            histogram = self.request_duration[key] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+        if route not in self.request_queries:
+            self.request_queries[route] = Histogram(QUERY_COUNT_BUCKETS)
+            self.request_query_seconds[route] = Histogram(LATENCY_BUCKETS)
+        self.request_queries[route].observe(stats.queries)
+        self.request_query_seconds[route].observe(stats.query_seconds)
+        self.queries_total += stats.queries
+        self.query_seconds_total += stats.query_seconds
+        for wait in stats.pool_waits:
+            self.pool_wait.observe(wait)
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """Records latency per route template, in-flight requests and the
+    database work each request did."""
+
+    def __init__(self, app, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # If the app fails before sending a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        self.registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.registry.in_flight -= 1
+            _request_stats.reset(token)
+            # Route templates keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.record(scope["method"], route, status, elapsed, stats)
+
+
+# Called as observer(statement, cursor, elapsed) after every statement, so
+# other instrumentation (the profiler) reuses this timing instead of adding
+# its own listeners
+statement_observers = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+    for observer in statement_observers:
+        observer(statement, cursor, elapsed)
+
+
+def timed_pool(pool_class):
+    # Pool subclass that adds the time spent waiting for a connection to
+    # the current request's stats
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                stats = _request_stats.get()
+                if stats is not None:
+                    stats.pool_waits.append(time.perf_counter() - start)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    # SQLAlchemy names pool loggers after the class; keep the base class's
+    # name so pool records stay under "sqlalchemy" (WARN unless echo_pool)
+    # rather than reaching the root logger at INFO
+    TimedPool._sqla_logger_namespace = f"{pool_class.__module__}.{pool_class.__name__}"
+    return TimedPool
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels) -> list:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def render(registry: Metrics = metrics, pools: dict = None, caches: dict = None) -> str:
+    # Prometheus text exposition format 0.0.4
+    lines = [
+        "# HELP http_requests_in_flight Requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {registry.in_flight}",
+        "# HELP http_request_duration_seconds Request latency by route template.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route, status), histogram in sorted(registry.request_duration.items()):
+        lines += _histogram_lines("http_request_duration_seconds", histogram, method=method, route=route, status=status)
+
+    lines += [
+        "# HELP db_request_queries Database statements executed per request.",
+        "# TYPE db_request_queries histogram",
+    ]
+    for route, histogram in sorted(registry.request_queries.items()):
+        lines += _histogram_lines("db_request_queries", histogram, route=route)
+    lines += [
+        "# HELP db_request_query_seconds Time spent executing statements per request.",
+        "# TYPE db_request_query_seconds histogram",
+    ]
+    for route, histogram in sorted(registry.request_query_seconds.items()):
+        lines += _histogram_lines("db_request_query_seconds", histogram, route=route)
+    lines += [
+        "# HELP db_queries_total Database statements executed while serving requests.",
+        "# TYPE db_queries_total counter",
+        f"db_queries_total {registry.queries_total}",
+        "# HELP db_query_seconds_total Time spent executing statements while serving requests.",
+        "# TYPE db_query_seconds_total counter",
+        f"db_query_seconds_total {registry.query_seconds_total}",
+        "# HELP db_pool_checkout_wait_seconds Time waiting for a pooled connection.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    lines += _histogram_lines("db_pool_checkout_wait_seconds", registry.pool_wait)
+
+    pool_gauges = (
+        ("db_pool_size", "Configured pool size.", "size"),
+        ("db_pool_checked_out", "Connections currently checked out.", "checkedout"),
+        ("db_pool_overflow", "Connections open beyond the pool size.", "overflow"),
+    )
+    for name, help_text, method in pool_gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for engine_name, pool in sorted((pools or {}).items()):
+            # Single-connection pools (in-memory SQLite) have no sizing
+            if hasattr(pool, method):
+                lines.append(f"{name}{_labels(engine=engine_name)} {getattr(pool, method)()}")
+
+    cache_metrics = (
+        ("auth_cache_hits_total", "counter", "Cache lookups that found a live entry.", "hits"),
+        ("auth_cache_misses_total", "counter", "Cache lookups that found nothing.", "misses"),
+        ("auth_cache_evictions_total", "counter", "Entries evicted to stay under max size.", "evictions"),
+        ("auth_cache_size", "gauge", "Entries currently cached.", "size"),
+    )
+    stats = {cache_name: cache.stats() for cache_name, cache in sorted((caches or {}).items())}
+    for name, kind, help_text, key in cache_metrics:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for cache_name, cache_stats in stats.items():
+            lines.append(f"{name}{_labels(cache=cache_name)} {cache_stats[key]}")
+    lines += ["# HELP auth_cache_hit_ratio Hits over lookups since start.", "# TYPE auth_cache_hit_ratio gauge"]
+    for cache_name, cache_stats in stats.items():
+        lookups = cache_stats["hits"] + cache_stats["misses"]
+        lines.append(f"auth_cache_hit_ratio{_labels(cache=cache_name)} {cache_stats['hits'] / lookups if lookups else 0.0}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,131 @@
+import json
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from models import Task, TaskTag, TaskTombstone, TaskVersion
+from search import FTS_DDL
+
+
+# Base.metadata.create_all() only creates missing tables. It never adds
+# indexes, columns or triggers to a database created by an older version of
+# the app, so those schema changes live here. Each migration runs once, in
+# order, and is recorded in the schema_migrations table.
+
+
+def _create_indexes(conn, table, *names):
+    # Idempotent: indexes created by create_all on a fresh database are skipped
+    for index in table.indexes:
+        if index.name in names:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _add_column(conn, table, ddl):
+    # SQLite has no ADD COLUMN IF NOT EXISTS
+    column = ddl.split()[0]
+    if column not in {col["name"] for col in inspect(conn).get_columns(table.name)}:
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def _create_task_indexes(conn):
+    _create_indexes(conn, Task.__table__, "ix_tasks_owner_id")
+
+
+def _create_task_search_index(conn):
+    # FTS5 is SQLite-only; other databases keep the LIKE-based search
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in FTS_DDL:
+        conn.execute(text(statement))
+
+
+def _move_tags_to_task_tags(conn):
+    # Copy the legacy JSON tags column into task_tags, then clear it so the
+    # two can't drift apart
+    task_tags = TaskTag.__table__
+    task_tags.create(bind=conn, checkfirst=True)
+
+    rows = conn.execute(text(
+        "SELECT id, owner_id, tags FROM tasks WHERE tags IS NOT NULL AND tags != '[]'"
+    ))
+    tag_rows = []
+    for task_id, owner_id, raw_tags in rows:
+        try:
+            tags = json.loads(raw_tags)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(tags, list):
+            continue
+        for position, tag in enumerate(dict.fromkeys(str(tag) for tag in tags)):
+            tag_rows.append({"task_id": task_id, "tag": tag, "owner_id": owner_id, "position": position})
+
+    if tag_rows:
+        conn.execute(task_tags.insert(), tag_rows)
+    conn.execute(text("UPDATE tasks SET tags = NULL WHERE tags IS NOT NULL"))
+
+
+def _add_task_change_log(conn):
+    # Existing tasks start at change_seq 0; a full sync (since=0) returns
+    # every task regardless of change_seq
+    _add_column(conn, Task.__table__, "change_seq INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, TaskVersion.__table__, "compacted_seq INTEGER NOT NULL DEFAULT 0")
+    _create_indexes(conn, Task.__table__, "ix_tasks_owner_change_seq")
+    TaskTombstone.__table__.create(bind=conn, checkfirst=True)
+
+
+def _create_task_filter_indexes(conn):
+    _create_indexes(conn, Task.__table__, "ix_tasks_owner_completed_priority", "ix_tasks_owner_due_date")
+
+
+def _add_task_sort_indexes(conn):
+    # priority_rank is a generated column; SQLite can only add VIRTUAL ones
+    ddl = str(CreateColumn(Task.__table__.c.priority_rank).compile(dialect=conn.dialect))
+    _add_column(conn, Task.__table__, ddl)
+    _create_indexes(conn, Task.__table__, "ix_tasks_owner_priority_rank", "ix_tasks_owner_title")
+
+
+def _key_tombstones_by_owner(conn):
+    # Rebuild task_tombstones with an (owner_id, task_id) primary key; a
+    # primary key can't be changed in place
+    if inspect(conn).get_pk_constraint("task_tombstones")["constrained_columns"] == ["owner_id", "task_id"]:
+        return
+    conn.execute(text("ALTER TABLE task_tombstones RENAME TO task_tombstones_old"))
+    # Indexes keep their names when their table is renamed
+    for index in inspect(conn).get_indexes("task_tombstones_old"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    TaskTombstone.__table__.create(bind=conn)
+    conn.execute(text(
+        "INSERT INTO task_tombstones (owner_id, task_id, change_seq, deleted_at) "
+        "SELECT owner_id, task_id, change_seq, deleted_at FROM task_tombstones_old"
+    ))
+    conn.execute(text("DROP TABLE task_tombstones_old"))
+
+
+MIGRATIONS = [
+    (1, "index tasks by owner", _create_task_indexes),
+    (2, "full-text search index for tasks", _create_task_search_index),
+    (3, "move task tags into task_tags", _move_tags_to_task_tags),
+    (4, "task change sequence and tombstones", _add_task_change_log),
+    (5, "composite indexes for task filters", _create_task_filter_indexes),
+    (6, "indexes for task sort orders", _add_task_sort_indexes),
+    (7, "key task tombstones by owner", _key_tombstones_by_owner),
+]
+
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL)"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": name}
+            )
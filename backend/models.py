@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Computed, ForeignKey, Index, Integer, String, DateTime, event
 from sqlalchemy.orm import relationship
 from database import Base
 from sqlalchemy.sql import func
@@ -24,11 +24,100 @@ class Task(Base):
     description = Column(String, nullable=True)
     completed = Column(Boolean, default=False, nullable=False)
     priority = Column(String, default='medium', nullable=False)  # low, medium, high
+    # Sortable form of priority, computed by the database (NULL for unknown values)
+    priority_rank = Column(Integer, Computed(
+        "CASE priority WHEN 'low' THEN 0 WHEN 'medium' THEN 1 WHEN 'high' THEN 2 END"
+    ))
     due_date = Column(DateTime, nullable=True)
-    tags = Column(String, nullable=True)  # Store as JSON string for simplicity
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tags_json = Column("tags", String, nullable=True)  # Legacy JSON tags, moved to task_tags by migration 3
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    change_seq = Column(Integer, default=0, server_default="0", nullable=False)  # Owner's task version at the last write
 
     # Relationship to user
-    owner = relationship("User", back_populates="tasks")
\ No newline at end of file
+    owner = relationship("User", back_populates="tasks")
+
+    # Tags live in task_tags; selectin loads a whole page's tags in one query
+    tag_rows = relationship(
+        "TaskTag",
+        back_populates="task",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="TaskTag.position"
+    )
+
+    @property
+    def tags(self):
+        return [row.tag for row in self.tag_rows]
+
+    @tags.setter
+    def tags(self, values):
+        # Keep rows for tags that stay, drop duplicates, and preserve the
+        # order the client sent
+        existing = {row.tag: row for row in self.tag_rows}
+        rows = []
+        for position, tag in enumerate(dict.fromkeys(values or [])):
+            row = existing.get(tag) or TaskTag(tag=tag)
+            row.position = position
+            rows.append(row)
+        self.tag_rows = rows
+
+    # Every task query filters on owner_id. ix_tasks_owner_id alone still
+    # serves the default id order, since SQLite appends the rowid to it, and
+    # each sort index likewise ends in an implicit id tie-breaker.
+    __table_args__ = (
+        Index("ix_tasks_owner_completed_priority", "owner_id", "completed", "priority"),  # list filters
+        Index("ix_tasks_owner_due_date", "owner_id", "due_date"),  # due date ranges
+        Index("ix_tasks_owner_change_seq", "owner_id", "change_seq"),  # delta sync
+        Index("ix_tasks_owner_priority_rank", "owner_id", "priority_rank"),  # sort=priority
+        Index("ix_tasks_owner_title", "owner_id", "title"),  # sort=title
+    )
+
+
+class TaskTag(Base):
+    __tablename__ = "task_tags"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Denormalized for the tag filter
+    position = Column(Integer, default=0, nullable=False)
+
+    # Relationship to task
+    task = relationship("Task", back_populates="tag_rows")
+
+    # Serves the tag filter: owner + tag lookups that return task ids
+    __table_args__ = (
+        Index("ix_task_tags_owner_tag", "owner_id", "tag", "task_id"),
+    )
+
+
+class TaskVersion(Base):
+    __tablename__ = "task_versions"
+
+    # Bumped in the same transaction as every write to the user's tasks
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    # Tombstones up to this version have been compacted away
+    compacted_seq = Column(Integer, default=0, server_default="0", nullable=False)
+
+
+class TaskTombstone(Base):
+    __tablename__ = "task_tombstones"
+
+    # One row per deleted task, so delta sync can report deletions. Keyed
+    # by owner too: SQLite reuses the highest freed task id, so another
+    # user's deletion of the same id must not overwrite this one.
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    task_id = Column(Integer, primary_key=True)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    __table_args__ = (
+        Index("ix_task_tombstones_owner_change_seq", "owner_id", "change_seq"),
+    )
+
+
+@event.listens_for(TaskTag, "before_insert")
+def _copy_task_owner(mapper, connection, target):
+    target.owner_id = target.task.owner_id
@@ -0,0 +1,78 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+# Upper bound for the `limit` query parameter on paginated list endpoints
+MAX_PAGE_SIZE = 200
+
+# Name of the sort order a cursor was issued for
+DEFAULT_SORT = "id"
+
+
+def encode_cursor(sort: str, sort_value, row_id: int) -> str:
+    # Opaque to clients: base64url of the (sort, sort key, id) position.
+    # Datetime sort keys travel as ISO 8601 strings.
+    payload = json.dumps([sort, sort_value, row_id], separators=(",", ":"), default=datetime.isoformat)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, value_type: type = None):
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise invalid_cursor
+
+    # A cursor is only meaningful for the ordering it was issued for
+    if cursor_sort != sort:
+        raise invalid_cursor
+    # Clients can forge cursors: only scalars reach the seek condition
+    # (bool is an int subclass, but never a sort key or an id)
+    if isinstance(row_id, bool) or not isinstance(row_id, int):
+        raise invalid_cursor
+    if isinstance(sort_value, bool) or not isinstance(sort_value, (str, int, float, type(None))):
+        raise invalid_cursor
+
+    if value_type is datetime and sort_value is not None:
+        try:
+            sort_value = datetime.fromisoformat(sort_value)
+        except (ValueError, TypeError):
+            raise invalid_cursor
+
+    return sort_value, row_id
+
+
+def after_cursor(sort_column, id_column, sort_value, row_id: int, descending: bool = False):
+    # Seek condition for rows strictly after (sort_value, row_id) in the
+    # (sort_column, id_column) ordering, so no OFFSET scan is needed
+    if sort_column is id_column:
+        return id_column < row_id if descending else id_column > row_id
+
+    # SQLite sorts NULLs first, so they lead an ascending order and trail a
+    # descending one
+    if sort_value is None:
+        if descending:
+            return and_(sort_column.is_(None), id_column < row_id)
+        return or_(
+            sort_column.is_not(None),
+            and_(sort_column.is_(None), id_column > row_id)
+        )
+
+    if descending:
+        return or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id),
+            sort_column.is_(None)
+        )
+    return or_(
+        sort_column > sort_value,
+        and_(sort_column == sort_value, id_column > row_id)
+    )
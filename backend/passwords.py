@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# bcrypt cost factor; hashes made with any other cost are rehashed on the
+# next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# bcrypt runs in a dedicated process pool so 100-300 ms of CPU per call never
+# holds a request thread or the GIL. At most PASSWORD_HASH_QUEUE_SIZE calls
+# may be running or waiting; beyond that requests fail fast with 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+
+# Password hashing context
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+_queue_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE_SIZE)
+
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password, hashed_password):
+    # (valid, new hash or None when the stored hash is current)
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def get_password_hash(password: str):
+    password = password[:72]   # truncate to bcrypt limit
+    return pwd_context.hash(password)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process that is already running threads
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _discard_pool(broken):
+    # Only the broken pool: another request may already have replaced it
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+async def _run_in_pool(fn, *args):
+    if not _queue_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry",
+            headers={"Retry-After": "1"},
+        )
+    loop = asyncio.get_running_loop()
+    try:
+        pool = _get_pool()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory), which breaks the whole
+            # pool for good; start a new one and retry once
+            logger.warning("Password hash pool broken, restarting it")
+            _discard_pool(pool)
+            return await loop.run_in_executor(_get_pool(), fn, *args)
+    finally:
+        _queue_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(get_password_hash, password)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_in_pool(verify_and_update_password, plain_password, hashed_password)
@@ -0,0 +1,116 @@
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from logs import RateLimitFilter
+from metrics import statement_observers
+
+# Statements slower than this are logged with their SQL and timing
+DB_SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_MS", "100")) / 1000
+# Requests issuing more statements than this are logged with every statement
+# they ran (0 turns per-request profiling off)
+DB_REQUEST_QUERY_BUDGET = int(os.getenv("DB_REQUEST_QUERY_BUDGET", "0"))
+
+logger = logging.getLogger(__name__)
+logger.addFilter(RateLimitFilter())
+
+
+class QueryRecord:
+    __slots__ = ("statement", "seconds", "rows")
+
+    def __init__(self, statement: str, seconds: float, rows):
+        self.statement = statement
+        self.seconds = seconds
+        self.rows = rows  # None where the driver doesn't report it (SELECT)
+
+    def __repr__(self):
+        return f"QueryRecord({self.statement!r}, seconds={self.seconds:.6f}, rows={self.rows})"
+
+
+class QueryProfile:
+    def __init__(self):
+        self.queries = []
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+
+    def report(self) -> str:
+        lines = [f"{len(self)} statements in {self.seconds * 1e3:.2f} ms"]
+        for query in self.queries:
+            lines.append(f"  {query.seconds * 1e3:8.2f} ms  rows={query.rows}  {' '.join(query.statement.split())}")
+        return "\n".join(lines)
+
+
+# Profiles open in the current context; nested ones all see each statement
+_profiles: ContextVar = ContextVar("query_profiles", default=())
+
+
+@contextmanager
+def profile_queries():
+    # Records every statement run in this context (including worker threads
+    # started with run_in_threadpool, which copy the context)
+    profile = QueryProfile()
+    token = _profiles.set(_profiles.get() + (profile,))
+    try:
+        yield profile
+    finally:
+        _profiles.reset(token)
+
+
+@contextmanager
+def query_budget(max_statements: int):
+    # For tests: fail when the block runs more statements than budgeted
+    with profile_queries() as profile:
+        yield profile
+    if len(profile) > max_statements:
+        raise AssertionError(f"Query budget of {max_statements} exceeded: {profile.report()}")
+
+
+def _record_statement(statement: str, cursor, elapsed: float):
+    # Timed once, by the metrics listeners
+    profiles = _profiles.get()
+    if not profiles and elapsed < DB_SLOW_QUERY_SECONDS:
+        return
+
+    rows = cursor.rowcount if cursor.rowcount >= 0 else None
+    if elapsed >= DB_SLOW_QUERY_SECONDS:
+        logger.warning("Slow query", extra={"statement": statement, "seconds": elapsed, "rows": rows})
+    if profiles:
+        record = QueryRecord(statement, elapsed, rows)
+        for profile in profiles:
+            profile.queries.append(record)
+
+
+statement_observers.append(_record_statement)
+
+
+class QueryProfileMiddleware:
+    """Profiles each request's statements and logs the requests that run
+    more than `budget` of them, to catch N+1 patterns in production."""
+
+    def __init__(self, app, budget: int = DB_REQUEST_QUERY_BUDGET):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries() as profile:
+            await self.app(scope, receive, send)
+        if len(profile) > self.budget:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            logger.warning(
+                "Request exceeded query budget",
+                extra={
+                    "method": scope["method"], "route": route, "budget": self.budget,
+                    "statements": [query.statement for query in profile.queries],
+                    "seconds": profile.seconds,
+                }
+            )
@@ -1,5 +1,8 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, timezone
+from typing import Annotated, Literal, Optional, Union
+
+from pagination import MAX_PAGE_SIZE
 
 
 # User schemas
@@ -30,38 +33,157 @@ class Token(BaseModel):
     token_type: str
 
 
+class EventStreamToken(BaseModel):
+    token: str
+    expires_in: int  # seconds
+
+
 class TokenData(BaseModel):
     user_id: Optional[str] = None  # Changed to reflect that it holds user ID as string
 
 
+# Date formats accepted for due dates besides ISO 8601, tried in order
+DUE_DATE_FORMATS = ('%m/%d/%Y', '%d/%m/%Y')
+
+
+def parse_due_date(value):
+    # Every write path stores due dates the same way: naive UTC datetimes,
+    # so they compare correctly in range filters
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        # JavaScript's toISOString() ends in Z, which fromisoformat only
+        # accepts from Python 3.11
+        if value[-1:] in ("Z", "z"):
+            value = value[:-1] + "+00:00"
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            for fmt in DUE_DATE_FORMATS:
+                try:
+                    value = datetime.strptime(value, fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError("due_date must be an ISO 8601 date or datetime")
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 # Task schemas
 class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
     completed: bool = False
     priority: Optional[str] = 'medium'  # low, medium, high
-    due_date: Optional[str] = None  # ISO format date string
+    due_date: Optional[datetime] = None  # ISO 8601 date or datetime, stored as naive UTC
     tags: Optional[list[str]] = []  # List of tags
 
+    _normalize_due_date = field_validator("due_date", mode="before")(parse_due_date)
+
 
 class TaskCreate(TaskBase):
     pass
 
 
+class TaskListParams(BaseModel):
+    # Query parameters for GET /api/{user_id}/tasks
+    completed: Optional[bool] = None
+    priority: Optional[str] = None
+    search: Optional[str] = None
+    tag: list[str] = []
+    tag_mode: Literal["any", "all"] = "any"
+    due_from: Optional[datetime] = None  # Inclusive
+    due_to: Optional[datetime] = None  # Exclusive, so due_to of one month is due_from of the next
+    overdue: bool = False  # Only incomplete tasks due before now
+    sort: Optional[Literal["id", "created_at", "due_date", "priority", "title"]] = None  # Default: id, or relevance for an unpaginated search
+    order: Literal["asc", "desc"] = "asc"
+    fields: Optional[str] = None  # Comma-separated Task fields to return; all by default
+    limit: Optional[int] = Field(None, ge=1, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = None
+
+    _normalize_due_range = field_validator("due_from", "due_to", mode="before")(parse_due_date)
+
+
 class TaskUpdate(TaskBase):
     title: Optional[str] = None
     description: Optional[str] = None
     completed: Optional[bool] = None
     priority: Optional[str] = None
-    due_date: Optional[str] = None
+    due_date: Optional[datetime] = None
     tags: Optional[list[str]] = None
 
 
 class Task(TaskBase):
     id: int
     owner_id: int
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class TaskChanges(BaseModel):
+    # Response of GET /api/{user_id}/tasks/changes
+    changed: list[Task]
+    deleted: list[int]
+    sync_token: int  # Pass as ?since= on the next sync
+
+
+class TaskStats(BaseModel):
+    # Response of GET /api/{user_id}/tasks/stats
+    total: int
+    completed: int
+    pending: int
+    overdue: int
+    by_priority: dict[str, int]
+
+
+# Batch schemas
+MAX_BATCH_OPERATIONS = 500
+
+
+class TaskBatchCreate(BaseModel):
+    op: Literal["create"]
+    task: TaskCreate
+
+
+class TaskBatchUpdate(BaseModel):
+    op: Literal["update"]
+    task_id: int
+    task: TaskUpdate
+
+
+class TaskBatchToggle(BaseModel):
+    op: Literal["toggle"]
+    task_id: int
+
+
+class TaskBatchDelete(BaseModel):
+    op: Literal["delete"]
+    task_id: int
+
+
+TaskBatchOperation = Annotated[
+    Union[TaskBatchCreate, TaskBatchUpdate, TaskBatchToggle, TaskBatchDelete],
+    Field(discriminator="op")
+]
+
+
+class TaskBatchRequest(BaseModel):
+    operations: list[TaskBatchOperation] = Field(min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+
+class TaskBatchResult(BaseModel):
+    op: str
+    status: int
+    task_id: Optional[int] = None
+    task: Optional[Task] = None
+    detail: Optional[str] = None
+
+
+class TaskBatchResponse(BaseModel):
+    results: list[TaskBatchResult]
@@ -0,0 +1,54 @@
+from sqlalchemy import column, literal_column, table
+
+# External-content FTS5 index over tasks(title, description, owner_id),
+# created and kept in sync by triggers (see migrations.py). owner_id is an
+# indexed column so a search only visits the owner's postings instead of
+# filtering every match in the table.
+tasks_fts = table("tasks_fts", column("rowid"), column("rank"))
+
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description, owner_id,
+        content='tasks', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description, owner_id)
+        VALUES (new.id, new.title, new.description, new.owner_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_update
+    AFTER UPDATE OF title, description, owner_id ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+        INSERT INTO tasks_fts(rowid, title, description, owner_id)
+        VALUES (new.id, new.title, new.description, new.owner_id);
+    END""",
+    # Rank title hits above description hits; owner_id never contributes
+    "INSERT INTO tasks_fts(tasks_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 0.0)')",
+    # Index rows that existed before the FTS table was created
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+]
+
+
+def fts_enabled(db) -> bool:
+    # The FTS5 index only exists on SQLite; other databases fall back to LIKE
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def build_match_query(owner_id: int, search: str):
+    # Quote every term so user input can't inject FTS5 query syntax, and
+    # make each one a prefix match ("mil" finds "milk")
+    terms = ['"' + term.replace('"', '""') + '"*' for term in search.split()]
+    return f'owner_id : "{owner_id}" AND {{title description}} : ({" AND ".join(terms)})'
+
+
+def match_tasks(query, task_id_column, match_query: str):
+    # Join the FTS index and return the query plus its rank column
+    # (bm25, lower is more relevant)
+    query = query.join(tasks_fts, tasks_fts.c.rowid == task_id_column).filter(
+        literal_column("tasks_fts").match(match_query)
+    )
+    return query, tasks_fts.c.rank
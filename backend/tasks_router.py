@@ -1,71 +1,576 @@
-import json
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from datetime import datetime, timezone
+from typing import Annotated, Literal, Optional
 
-from database import get_db
-from models import Task as TaskModel, User
-from schemas import TaskCreate, TaskUpdate, Task
-from dependencies import get_current_user
+import anyio
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import JSON, DateTime, or_, and_, delete, func, insert, select, type_coerce, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from database import DbSession, close_db, get_db, run_db
+from models import Task as TaskModel, TaskTag, TaskTombstone, TaskVersion, User
+from schemas import TaskCreate, TaskUpdate, Task, TaskListParams, TaskBatchRequest, TaskBatchResponse, TaskChanges, TaskStats, EventStreamToken
+from dependencies import (
+    EVENT_STREAM_TOKEN_EXPIRE_SECONDS, create_event_stream_token, get_current_user, get_event_stream_user
+)
+from pagination import DEFAULT_SORT, encode_cursor, decode_cursor, after_cursor
+from search import build_match_query, fts_enabled, match_tasks
+from events import EVENT_STREAM_HEARTBEAT_SECONDS, broker, event_stream
+from export import EXPORT_BATCH_SIZE, EXPORT_MEDIA_TYPES, export_stream
+from versions import bump_task_version, etag_matches, get_task_version, make_etag, record_task_changes
 
 # Create tasks router with prefix and tags
 router = APIRouter(prefix="/api", tags=["tasks"])
 
+# Event published for each successful batch operation other than delete
+_BATCH_EVENTS = {"create": "task.created", "update": "task.updated", "toggle": "task.toggled"}
 
-@router.get("/{user_id}/tasks", response_model=list[Task])
-def get_tasks(
-    user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    completed: bool = None,
-    priority: str = None,
-    search: str = None
-):
-    # Ensure user can only access their own tasks
-    if current_user.id != user_id:
+
+def _build_task(task: TaskCreate, user_id: int) -> TaskModel:
+    # due_date arrives already normalized by the schema
+    return TaskModel(**task.model_dump(), owner_id=user_id)
+
+
+def _apply_update(task: TaskModel, task_update: TaskUpdate):
+    update_data = task_update.model_dump(exclude_unset=True)
+
+    for field, value in update_data.items():
+        setattr(task, field, value)
+
+
+def _not_found():
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Task not found"
+    )
+
+
+# Each endpoint's database work lives in a sync function taking the session,
+# run through run_db so it works with both the sync and the async engine.
+# They return schema objects, so nothing lazy-loads after the session closes.
+
+
+# Columns behind each sort= value. Each one has an (owner_id, column) index,
+# and ids are unique, so id breaks ties. Ids are assigned in insertion
+# order, which makes them the created_at order too.
+_SORT_COLUMNS = {
+    "id": TaskModel.id,
+    "created_at": TaskModel.id,
+    "due_date": TaskModel.due_date,
+    "priority": TaskModel.priority_rank,
+    "title": TaskModel.title,
+}
+
+# Task schema fields in serialization order
+_TASK_FIELDS = tuple(Task.model_fields)
+
+
+def _parse_fields(fields: str = None) -> tuple:
+    # fields=title,completed selects a subset of the Task schema; id is
+    # always included so clients (and cursors) can identify rows
+    if not fields:
+        return _TASK_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(_TASK_FIELDS)
+    if unknown:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access these tasks"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
         )
+    return tuple(field for field in _TASK_FIELDS if field in requested or field == "id")
 
-    # Build query with filters
-    query = db.query(TaskModel).filter(TaskModel.owner_id == user_id)
 
-    if completed is not None:
-        query = query.filter(TaskModel.completed == completed)
+def _field_columns(fields: tuple) -> tuple:
+    # The columns behind the requested fields; tags live in task_tags
+    return tuple(getattr(TaskModel, field) for field in fields if field != "tags")
 
-    if priority:
-        query = query.filter(TaskModel.priority == priority)
 
-    if search:
-        query = query.filter(
-            or_(
-                TaskModel.title.contains(search),
-                TaskModel.description.contains(search)
-            )
+# Task ids per tags query, well under SQLite's bound-parameter limit
+_TAG_QUERY_CHUNK = 500
+
+
+def _load_tags(db: Session, task_ids: list[int]) -> dict:
+    # Tags of the listed tasks only, a chunk of ids at a time, read through
+    # the task_tags primary key. The ids are already the owner's, so there
+    # is no owner_id term: with one, SQLite picks ix_task_tags_owner_tag and
+    # sorts in a temp B-tree. Each task has a handful of tags, so they are
+    # put in position order here rather than by an ORDER BY.
+    rows = {task_id: [] for task_id in task_ids}
+    for start in range(0, len(task_ids), _TAG_QUERY_CHUNK):
+        chunk = task_ids[start:start + _TAG_QUERY_CHUNK]
+        query = db.query(TaskTag.task_id, TaskTag.position, TaskTag.tag).filter(TaskTag.task_id.in_(chunk))
+        for task_id, position, tag in query:
+            rows[task_id].append((position, tag))
+    return {task_id: [tag for _, tag in sorted(task_rows)] for task_id, task_rows in rows.items()}
+
+
+def _tags_column(db: Session):
+    # A task's tags, in order, as one JSON array, so a write can RETURN
+    # them instead of querying task_tags afterwards
+    if db.get_bind().dialect.name == "postgresql":
+        tags = select(func.json_agg(aggregate_order_by(TaskTag.tag, TaskTag.position))) \
+            .where(TaskTag.task_id == TaskModel.id)
+    else:
+        ordered = select(TaskTag.tag).where(TaskTag.task_id == TaskModel.id) \
+            .order_by(TaskTag.position).correlate(TaskModel).subquery()
+        tags = select(func.json_group_array(ordered.c.tag))
+    return type_coerce(tags.scalar_subquery(), JSON).label("tags")
+
+
+def _returned_task(row, tags: list[str] = None) -> Task:
+    # A Task from a RETURNING row; tags come from the row unless given
+    values = dict(row._mapping)
+    values["tags"] = tags if tags is not None else values.get("tags") or []
+    return Task.model_validate(values)
+
+
+def _insert_tags(db: Session, user_id: int, task_id: int, tags: list[str]) -> list[str]:
+    # Duplicates dropped, in the order the client sent them
+    tags = list(dict.fromkeys(tags or []))
+    if tags:
+        db.execute(insert(TaskTag), [
+            {"task_id": task_id, "tag": tag, "owner_id": user_id, "position": position}
+            for position, tag in enumerate(tags)
+        ])
+    return tags
+
+
+def _task_rows(db: Session, user_id: int, rows, fields: tuple) -> list[dict]:
+    # Shape column rows like the Task schema, restricted to fields
+    keys = tuple(column.key for column in _field_columns(fields))
+    tags = _load_tags(db, [row.id for row in rows]) if "tags" in fields else {}
+    tasks = []
+    for row in rows:
+        # zip stops before any trailing sort value
+        values = dict(zip(keys, row))
+        if "tags" in fields:
+            values["tags"] = tags[row.id]
+        tasks.append({field: values[field] for field in fields})
+    return tasks
+
+
+def _list_tasks(db: Session, user_id: int, params: TaskListParams):
+    # Build query with filters. Plain column rows instead of ORM objects:
+    # nothing is tracked by the session or validated row by row, and only
+    # the requested fields are read.
+    fields = _parse_fields(params.fields)
+    query = db.query(*_field_columns(fields)).select_from(TaskModel).filter(TaskModel.owner_id == user_id)
+
+    if params.completed is not None:
+        query = query.filter(TaskModel.completed == params.completed)
+
+    if params.priority:
+        query = query.filter(TaskModel.priority == params.priority)
+
+    # Due date ranges seek on the (owner_id, due_date) index
+    if params.due_from is not None:
+        query = query.filter(TaskModel.due_date >= params.due_from)
+
+    if params.due_to is not None:
+        query = query.filter(TaskModel.due_date < params.due_to)
+
+    if params.overdue:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        query = query.filter(TaskModel.due_date < now, TaskModel.completed.is_(False))
+
+    if params.tag:
+        # Semi-join against task_tags via its (owner_id, tag) index
+        tagged = select(TaskTag.task_id).where(
+            TaskTag.owner_id == user_id,
+            TaskTag.tag.in_(params.tag)
         )
+        if params.tag_mode == "all":
+            tagged = tagged.group_by(TaskTag.task_id).having(
+                func.count(TaskTag.tag) == len(set(params.tag))
+            )
+        query = query.filter(TaskModel.id.in_(tagged))
+
+    sort = params.sort or DEFAULT_SORT
+    sort_column = _SORT_COLUMNS[sort]
+    descending = params.order == "desc"
+
+    search = params.search
+    if search and search.strip():
+        if fts_enabled(db):
+            # Full-text search, most relevant first unless a sort was asked
+            # for. bm25 scores use statistics over every user's tasks, so
+            # any write anywhere shifts them; pages use the stable sort
+            # instead, or a cursor could skip or repeat rows.
+            query, rank = match_tasks(query, TaskModel.id, build_match_query(user_id, search))
+            paginated = params.limit is not None or params.cursor is not None
+            if params.sort is None and not paginated:
+                sort, sort_column, descending = "rank", rank, False
+        else:
+            query = query.filter(
+                or_(
+                    TaskModel.title.contains(search),
+                    TaskModel.description.contains(search)
+                )
+            )
+
+    # Keyset pagination: seek past the cursor position instead of using
+    # OFFSET, so every page costs the same however deep the client scrolls
+    # A cursor only continues the ordering it was issued for
+    cursor_sort = f"-{sort}" if descending else sort
+    if params.cursor:
+        value_type = datetime if isinstance(sort_column.type, DateTime) else None
+        sort_value, last_id = decode_cursor(params.cursor, cursor_sort, value_type)
+        query = query.filter(after_cursor(sort_column, TaskModel.id, sort_value, last_id, descending))
+
+    if sort_column is TaskModel.id:
+        query = query.order_by(TaskModel.id.desc() if descending else TaskModel.id)
+    elif descending:
+        query = query.order_by(sort_column.desc(), TaskModel.id.desc())
+    else:
+        query = query.order_by(sort_column, TaskModel.id)
 
-    tasks = query.all()
+    # Select the sort key alongside each task so the next cursor can be built
+    query = query.add_columns(sort_column)
 
-    # Convert tags JSON string back to list
-    for task in tasks:
-        if task.tags:
-            try:
-                task.tags = json.loads(task.tags)
-            except json.JSONDecodeError:
-                task.tags = []
+    next_cursor = None
+    if params.limit is None:
+        # Unpaginated requests still get the whole list
+        rows = query.all()
+    else:
+        # Fetch one extra row to learn whether another page exists
+        rows = query.limit(params.limit + 1).all()
+        if len(rows) > params.limit:
+            rows = rows[:params.limit]
+            last_row = rows[-1]
+            next_cursor = encode_cursor(cursor_sort, last_row[-1], last_row.id)
+
+    return _task_rows(db, user_id, rows, fields), next_cursor
+
+
+def _create_task(db: Session, user_id: int, task: TaskCreate) -> Task:
+    # due_date arrives already normalized by the schema
+    version = bump_task_version(db, user_id)
+    row = db.execute(
+        insert(TaskModel)
+        .values(**task.model_dump(exclude={"tags"}), owner_id=user_id, change_seq=version)
+        .returning(*_field_columns(_TASK_FIELDS))
+    ).one()
+    tags = _insert_tags(db, user_id, row.id, task.tags)
+    db.commit()
+    return _returned_task(row, tags)
+
+
+def _batch_tasks(db: Session, user_id: int, batch: TaskBatchRequest):
+    # Load every task the batch refers to with a single query
+    task_ids = {operation.task_id for operation in batch.operations if operation.op != "create"}
+    tasks = {}
+    if task_ids:
+        tasks = {
+            task.id: task
+            for task in db.query(TaskModel).filter(
+                TaskModel.owner_id == user_id,
+                TaskModel.id.in_(task_ids)
+            )
+        }
+
+    # (operation, task or None, status) for each operation, in order
+    applied = []
+    for operation in batch.operations:
+        if operation.op == "create":
+            task = _build_task(operation.task, user_id)
+            db.add(task)
+            applied.append((operation, task, status.HTTP_200_OK))
+            continue
+
+        task = tasks.get(operation.task_id)
+        if task is None:
+            applied.append((operation, None, status.HTTP_404_NOT_FOUND))
+            continue
+
+        if operation.op == "update":
+            _apply_update(task, operation.task)
+        elif operation.op == "toggle":
+            task.completed = not task.completed
         else:
-            task.tags = []
+            db.delete(task)
+            # Later operations on the same task see it as gone
+            del tasks[operation.task_id]
+            task = None
+        applied.append((operation, task, status.HTTP_200_OK))
+
+    # One version for the whole batch; tasks deleted later in the batch
+    # only get a tombstone
+    done = [(operation, task) for operation, task, result_status in applied if result_status == status.HTTP_200_OK]
+    if done:
+        deleted_ids = {operation.task_id for operation, task in done if operation.op == "delete"}
+        changed = {
+            id(task): task for operation, task in done
+            if task is not None and task.id not in deleted_ids
+        }
+        record_task_changes(db, user_id, changed=changed.values(), deleted_ids=deleted_ids)
+
+    # Flush to assign ids to created tasks, then commit everything at once
+    db.flush()
+    outcomes = [
+        (operation.op, task.id if task is not None else operation.task_id, result_status)
+        for operation, task, result_status in applied
+    ]
+    db.commit()
+
+    # Reload the surviving tasks in one query instead of a refresh per row
+    touched_ids = set(tasks) | {
+        task_id for op, task_id, result_status in outcomes if op == "create"
+    }
+    fresh = {}
+    if touched_ids:
+        fresh = {
+            task.id: Task.model_validate(task)
+            for task in db.query(TaskModel).filter(TaskModel.id.in_(touched_ids))
+        }
+
+    results = []
+    for op, task_id, result_status in outcomes:
+        result = {"op": op, "status": result_status, "task_id": task_id}
+        if result_status == status.HTTP_404_NOT_FOUND:
+            result["detail"] = "Task not found"
+        elif op != "delete":
+            result["task"] = fresh.get(task_id)
+        results.append(result)
+
+    return {"results": results}
+
+
+def _list_changes(db: Session, user_id: int, since: int) -> TaskChanges:
+    # Read the version first: anything written meanwhile is sent again on
+    # the next sync rather than missed
+    state = db.query(TaskVersion.version, TaskVersion.compacted_seq).filter(
+        TaskVersion.user_id == user_id
+    ).first()
+    version, compacted_seq = state or (0, 0)
+
+    if since > version or (since and since < compacted_seq):
+        # Token from the future, or deletions since then were compacted away
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, fetch all tasks with since=0"
+        )
+
+    changed = db.query(TaskModel).filter(TaskModel.owner_id == user_id)
+    if since:
+        # A full sync returns every task, including those written before
+        # change tracking (change_seq 0)
+        changed = changed.filter(TaskModel.change_seq > since)
+    changed = changed.order_by(TaskModel.change_seq, TaskModel.id).all()
+
+    deleted = []
+    if since:
+        # A full sync has nothing to delete
+        changed_ids = {task.id for task in changed}
+        deleted = [
+            task_id for task_id, in db.query(TaskTombstone.task_id).filter(
+                TaskTombstone.owner_id == user_id,
+                TaskTombstone.change_seq > since
+            ).order_by(TaskTombstone.change_seq, TaskTombstone.task_id)
+            if task_id not in changed_ids  # Id reused by a newer task
+        ]
+
+    return TaskChanges(
+        changed=[Task.model_validate(task) for task in changed],
+        deleted=deleted,
+        sync_token=version
+    )
+
+
+def _task_stats(db: Session, user_id: int) -> TaskStats:
+    # Both counts are answered from indexes alone: the GROUP BY reads
+    # (owner_id, completed, priority) and overdue seeks (owner_id, due_date)
+    counts = db.query(TaskModel.completed, TaskModel.priority, func.count()).filter(
+        TaskModel.owner_id == user_id
+    ).group_by(TaskModel.completed, TaskModel.priority).all()
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    overdue = db.query(func.count()).select_from(TaskModel).filter(
+        TaskModel.owner_id == user_id,
+        TaskModel.due_date < now,
+        TaskModel.completed.is_(False)
+    ).scalar()
+
+    by_priority = {}
+    for completed, priority, count in counts:
+        by_priority[priority] = by_priority.get(priority, 0) + count
+    total = sum(count for _, _, count in counts)
+    completed = sum(count for completed, _, count in counts if completed)
+    return TaskStats(
+        total=total,
+        completed=completed,
+        pending=total - completed,
+        overdue=overdue,
+        by_priority=by_priority
+    )
+
+
+def _get_task(db: Session, user_id: int, task_id: int, fields: str = None) -> dict:
+    fields = _parse_fields(fields)
+    row = db.query(*_field_columns(fields)).filter(
+        TaskModel.id == task_id,
+        TaskModel.owner_id == user_id
+    ).first()
+
+    if not row:
+        raise _not_found()
 
+    return _task_rows(db, user_id, [row], fields)[0]
+
+
+# Single-task writes are ownership-scoped UPDATE/DELETE statements that
+# RETURN the row, instead of loading the task, changing it and reading it
+# back. The version is bumped first so the row can be stamped with it; a
+# missing task rolls the bump back.
+
+
+def _update_task(db: Session, user_id: int, task_id: int, task_update: TaskUpdate) -> Task:
+    values = task_update.model_dump(exclude_unset=True)
+    replace_tags = "tags" in values
+    new_tags = values.pop("tags", None)
+
+    version = bump_task_version(db, user_id)
+    row = db.execute(
+        update(TaskModel)
+        .where(TaskModel.id == task_id, TaskModel.owner_id == user_id)
+        .values(**values, change_seq=version)
+        .returning(*_field_columns(_TASK_FIELDS), *(() if replace_tags else (_tags_column(db),)))
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        db.rollback()
+        raise _not_found()
+
+    tags = None
+    if replace_tags:
+        db.execute(delete(TaskTag).where(TaskTag.task_id == task_id))
+        tags = _insert_tags(db, user_id, task_id, new_tags)
+    db.commit()
+    return _returned_task(row, tags)
+
+
+def _delete_task(db: Session, user_id: int, task_id: int):
+    deleted = db.execute(
+        delete(TaskModel)
+        .where(TaskModel.id == task_id, TaskModel.owner_id == user_id)
+        .returning(TaskModel.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        raise _not_found()
+
+    # SQLite doesn't enforce the cascade, and task ids can be reused
+    db.execute(delete(TaskTag).where(TaskTag.task_id == task_id))
+    record_task_changes(db, user_id, deleted_ids=[task_id])
+    db.commit()
+
+
+def _toggle_task(db: Session, user_id: int, task_id: int) -> Task:
+    # Flipped by the database, so concurrent toggles can't both read the
+    # same old value
+    version = bump_task_version(db, user_id)
+    row = db.execute(
+        update(TaskModel)
+        .where(TaskModel.id == task_id, TaskModel.owner_id == user_id)
+        .values(completed=~TaskModel.completed, change_seq=version)
+        .returning(*_field_columns(_TASK_FIELDS), _tags_column(db))
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        db.rollback()
+        raise _not_found()
+
+    db.commit()
+    return _returned_task(row)
+
+
+def _open_export(db: Session, user_id: int):
+    # Streamed from the cursor EXPORT_BATCH_SIZE rows at a time, tags included
+    statement = select(*_field_columns(_TASK_FIELDS), _tags_column(db)) \
+        .where(TaskModel.owner_id == user_id) \
+        .order_by(TaskModel.id) \
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    return db.execute(statement)
+
+
+def _fetch_export_batch(db: Session, result) -> list[dict]:
+    tasks = []
+    for row in result.fetchmany(EXPORT_BATCH_SIZE):
+        values = dict(row._mapping)
+        values["tags"] = values["tags"] or []
+        tasks.append({field: values[field] for field in _TASK_FIELDS})
     return tasks
 
 
+async def _check_not_modified(db: DbSession, user_id: int, request: Request, response: Response):
+    # Conditional GET: the user's task version alone decides whether the
+    # client's copy is current, without reading the tasks table
+    version = await run_db(db, get_task_version, user_id)
+    etag = make_etag(version, request)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    return None
+
+
+# Task reads accept `fields`, and then each task has only the requested
+# keys, which a Task response_model would reject. Their shape is
+# documented instead.
+_NOT_MODIFIED_RESPONSE = {"description": "The client's copy (If-None-Match) is current"}
+_TASK_LIST_RESPONSES = {
+    200: {
+        "model": list[Task],
+        "description": "The user's tasks; with `fields`, each task has only those keys (and id)",
+        "headers": {
+            "X-Next-Cursor": {"description": "Cursor for the next page, when there is one", "schema": {"type": "string"}}
+        },
+    },
+    304: _NOT_MODIFIED_RESPONSE,
+}
+_TASK_RESPONSES = {
+    200: {"model": Task, "description": "The task; with `fields`, only those keys (and id)"},
+    304: _NOT_MODIFIED_RESPONSE,
+}
+
+
+@router.get("/{user_id}/tasks", response_model=None, responses=_TASK_LIST_RESPONSES)
+async def get_tasks(
+    user_id: int,
+    request: Request,
+    response: Response,
+    params: Annotated[TaskListParams, Query()],
+    current_user: User = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    # Ensure user can only access their own tasks
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access these tasks"
+        )
+
+    # Overdue results change with the clock, not only with writes
+    if not params.overdue:
+        not_modified = await _check_not_modified(db, user_id, request, response)
+        if not_modified:
+            return not_modified
+
+    tasks, next_cursor = await run_db(db, _list_tasks, user_id, params)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    # Rows are already in the Task schema's shape (or the requested subset
+    # of it); encode them directly
+    return Response(orjson.dumps(tasks), media_type="application/json", headers=response.headers)
+
+
 @router.post("/{user_id}/tasks", response_model=Task)
-def create_task(
+async def create_task(
     user_id: int,
     task: TaskCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     # Ensure user can only create tasks for themselves
     if current_user.id != user_id:
@@ -74,86 +579,173 @@ def create_task(
             detail="Not authorized to create tasks for this user"
         )
 
-    # Convert tags list to JSON string for storage
-    task_dict = task.model_dump()
-    if task_dict.get('tags'):
-        task_dict['tags'] = json.dumps(task_dict['tags'])
-    else:
-        task_dict['tags'] = json.dumps([])
-
-    # Handle due_date conversion to ensure compatibility
-    if task_dict.get('due_date'):
-        from datetime import datetime
-        due_date_str = task_dict['due_date']
-        # Try to parse the date string in various formats
-        date_formats = ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']
-        
-        parsed_date = None
-        for fmt in date_formats:
-            try:
-                parsed_date = datetime.strptime(due_date_str, fmt)
-                break
-            except ValueError:
-                continue
-        
-        # If none of the formats worked, leave as is and let DB handle it
-        if parsed_date:
-            task_dict['due_date'] = parsed_date
+    created = await run_db(db, _create_task, user_id, task)
+    broker.publish(user_id, "task.created", created)
+    return created
+
+
+@router.post("/{user_id}/tasks/batch", response_model=TaskBatchResponse)
+async def batch_tasks(
+    user_id: int,
+    batch: TaskBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    # Ensure user can only modify their own tasks
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify these tasks"
+        )
+
+    response = await run_db(db, _batch_tasks, user_id, batch)
+    for result in response["results"]:
+        if result["status"] != status.HTTP_200_OK:
+            continue
+        if result["op"] == "delete":
+            broker.publish(user_id, "task.deleted", {"id": result["task_id"]})
         else:
-            # If parsing fails, set to None to avoid database errors
-            task_dict['due_date'] = None
+            broker.publish(user_id, _BATCH_EVENTS[result["op"]], result["task"])
+    return response
 
-    db_task = TaskModel(**task_dict, owner_id=user_id)
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    return db_task
 
+@router.get("/{user_id}/tasks/changes", response_model=TaskChanges)
+async def get_task_changes(
+    user_id: int,
+    since: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    # Ensure user can only access their own tasks
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access these tasks"
+        )
+
+    return await run_db(db, _list_changes, user_id, since)
 
-@router.get("/{user_id}/tasks/{task_id}", response_model=Task)
-def get_task(
+
+@router.get("/{user_id}/tasks/stats", response_model=TaskStats)
+async def get_task_stats(
     user_id: int,
-    task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     # Ensure user can only access their own tasks
     if current_user.id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this task"
+            detail="Not authorized to access these tasks"
         )
 
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.owner_id == user_id
-    ).first()
+    return await run_db(db, _task_stats, user_id)
+
+
+@router.post("/{user_id}/tasks/events/token", response_model=EventStreamToken)
+async def create_task_events_token(
+    user_id: int,
+    current_user: User = Depends(get_current_user)
+):
+    # Ensure user can only access their own tasks
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access these tasks"
+        )
+
+    # For EventSource, which can't send an Authorization header: pass it as
+    # /tasks/events?token=. Only needed to connect; fetch a new one to reconnect.
+    return {"token": create_event_stream_token(user_id), "expires_in": EVENT_STREAM_TOKEN_EXPIRE_SECONDS}
+
+
+@router.get("/{user_id}/tasks/events")
+async def get_task_events(
+    user_id: int,
+    current_user: User = Depends(get_event_stream_user)
+):
+    # Ensure user can only access their own tasks
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access these tasks"
+        )
+
+    # Events are published after each write commits. Clients that connect,
+    # reconnect or receive a resync event catch up through /tasks/changes.
+    queue = broker.subscribe(user_id)
+    return StreamingResponse(
+        event_stream(broker, user_id, queue, EVENT_STREAM_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    if not task:
+
+@router.get("/{user_id}/tasks/export")
+async def export_tasks(
+    user_id: int,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    # Ensure user can only export their own tasks
+    if current_user.id != user_id:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to export these tasks"
         )
 
-    # Convert tags JSON string back to list
-    if task.tags:
+    async def batches():
         try:
-            task.tags = json.loads(task.tags)
-        except json.JSONDecodeError:
-            task.tags = []
-    else:
-        task.tags = []
+            result = await run_db(db, _open_export, user_id)
+            while tasks := await run_db(db, _fetch_export_batch, result):
+                yield tasks
+        finally:
+            # Also when the client disconnects mid-export
+            with anyio.CancelScope(shield=True):
+                await close_db(db)
+
+    filename = f"tasks.{export_format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_stream(batches(), export_format, _TASK_FIELDS, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/{user_id}/tasks/{task_id}", response_model=None, responses=_TASK_RESPONSES)
+async def get_task(
+    user_id: int,
+    task_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    # Ensure user can only access their own tasks
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this task"
+        )
+
+    not_modified = await _check_not_modified(db, user_id, request, response)
+    if not_modified:
+        return not_modified
 
-    return task
+    task = await run_db(db, _get_task, user_id, task_id, fields)
+    return Response(orjson.dumps(task), media_type="application/json", headers=response.headers)
 
 
 @router.put("/{user_id}/tasks/{task_id}", response_model=Task)
-def update_task(
+async def update_task(
     user_id: int,
     task_id: int,
     task_update: TaskUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     # Ensure user can only update their own tasks
     if current_user.id != user_id:
@@ -162,36 +754,17 @@ def update_task(
             detail="Not authorized to update this task"
         )
 
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.owner_id == user_id
-    ).first()
-
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
-
-    # Update task fields
-    update_data = task_update.model_dump(exclude_unset=True)
-    if 'tags' in update_data and update_data['tags'] is not None:
-        update_data['tags'] = json.dumps(update_data['tags'])
-    
-    for field, value in update_data.items():
-        setattr(task, field, value)
-
-    db.commit()
-    db.refresh(task)
-    return task
+    updated = await run_db(db, _update_task, user_id, task_id, task_update)
+    broker.publish(user_id, "task.updated", updated)
+    return updated
 
 
 @router.delete("/{user_id}/tasks/{task_id}")
-def delete_task(
+async def delete_task(
     user_id: int,
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     # Ensure user can only delete their own tasks
     if current_user.id != user_id:
@@ -199,29 +772,18 @@ def delete_task(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to delete this task"
         )
-    
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.owner_id == user_id
-    ).first()
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
-    
-    db.delete(task)
-    db.commit()
+
+    await run_db(db, _delete_task, user_id, task_id)
+    broker.publish(user_id, "task.deleted", {"id": task_id})
     return {"message": f"Task {task_id} deleted successfully"}
 
 
 @router.patch("/{user_id}/tasks/{task_id}/toggle", response_model=Task)
-def toggle_task_completion(
+async def toggle_task_completion(
     user_id: int,
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     # Ensure user can only toggle their own tasks
     if current_user.id != user_id:
@@ -229,20 +791,7 @@ def toggle_task_completion(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to toggle this task"
         )
-    
-    task = db.query(TaskModel).filter(
-        TaskModel.id == task_id,
-        TaskModel.owner_id == user_id
-    ).first()
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
-    
-    # Toggle completion status
-    task.completed = not task.completed
-    db.commit()
-    db.refresh(task)
-    return task
\ No newline at end of file
+
+    toggled = await run_db(db, _toggle_task, user_id, task_id)
+    broker.publish(user_id, "task.toggled", toggled)
+    return toggled
@@ -1,18 +1,31 @@
+import os
+import tempfile
+
+# The app's own engine points at a scratch database, so the app's startup
+# (and anything else using database.engine) never writes to todoapp.db.
+# Set before database is first imported.
+_scratch_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch_dir.name, 'app.db')}"
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from database import Base, get_db
 from main import app
+from migrations import run_migrations
 from models import User, Task
 
 
 # Create an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# (StaticPool keeps the single in-memory connection alive across sessions)
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,7 +34,8 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def test_db():
     # Create all tables
     Base.metadata.create_all(bind=engine)
-    
+    run_migrations(engine)
+
     # Create a test session
     db = TestingSessionLocal()
     try:
@@ -32,12 +46,33 @@ def test_db():
 
 @pytest.fixture(scope="module")
 def client(test_db):
+    # Fresh session per request, like database.get_db
     def override_get_db():
+        db = TestingSessionLocal()
         try:
-            yield test_db
+            yield db
         finally:
-            pass
+            db.close()
     
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
+
+
+@pytest.fixture
+def make_user(client):
+    # Register a user and return (user_id, auth headers)
+    def _make_user(username):
+        response = client.post(
+            "/api/auth/register",
+            json={
+                "username": username,
+                "email": f"{username}@example.com",
+                "password": "testpassword123"
+            }
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+        return user_id, headers
+
+    return _make_user
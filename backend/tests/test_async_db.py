@@ -0,0 +1,161 @@
+import threading
+
+import anyio
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database import Base, get_db
+from dependencies import create_access_token, user_cache
+from main import app
+from migrations import run_migrations
+from models import User
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def database_file(tmp_path):
+    # aiosqlite and the sync engine can only share a file-backed database
+    path = tmp_path / "async.db"
+    # User ids here overlap the shared test database's
+    user_cache.clear()
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=sync_engine)
+    run_migrations(sync_engine)
+
+    db = sessionmaker(bind=sync_engine)()
+    user = User(username="asyncuser", email="async@example.com", hashed_password="unused")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    yield path, sync_engine, user_id
+    user_cache.clear()
+    sync_engine.dispose()
+
+
+async def list_tasks_with_threadpool_exhausted(override_get_db, user_id):
+    # Hold the only worker thread, then see whether a task list request can
+    # still complete
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = 1
+    release = threading.Event()
+    token = create_access_token({"sub": str(user_id)})
+    app.dependency_overrides[get_db] = override_get_db
+    response = None
+
+    try:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(anyio.to_thread.run_sync, release.wait)
+            await anyio.sleep(0.05)
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                with anyio.move_on_after(1):
+                    response = await client.get(
+                        f"/api/{user_id}/tasks",
+                        headers={"Authorization": f"Bearer {token}"}
+                    )
+            release.set()
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        release.set()
+
+    return response
+
+
+@pytest.mark.anyio
+async def test_sync_sessions_are_capped_by_the_threadpool(database_file):
+    path, sync_engine, user_id = database_file
+    SyncSession = sessionmaker(bind=sync_engine)
+
+    def override_get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    assert await list_tasks_with_threadpool_exhausted(override_get_db, user_id) is None
+
+
+@pytest.mark.anyio
+async def test_async_sessions_do_not_need_the_threadpool(database_file):
+    path, sync_engine, user_id = database_file
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False)
+
+    async def override_get_db():
+        async with AsyncSession() as db:
+            yield db
+
+    try:
+        response = await list_tasks_with_threadpool_exhausted(override_get_db, user_id)
+    finally:
+        await async_engine.dispose()
+
+    assert response is not None
+    assert response.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_export_streams_through_async_sessions(database_file):
+    path, sync_engine, user_id = database_file
+    with sync_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO tasks (title, completed, priority, owner_id) VALUES ('One', 0, 'low', ?), ('Two', 1, 'high', ?)",
+            (user_id, user_id)
+        )
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False)
+
+    async def override_get_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    token = create_access_token({"sub": str(user_id)})
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                f"/api/{user_id}/tasks/export",
+                params={"format": "csv"},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+        # The stream closed the session it reopened
+        assert async_engine.pool.checkedout() == 0
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        await async_engine.dispose()
+
+    lines = response.text.splitlines()
+    assert lines[0].startswith("title,description,completed")
+    assert [line.split(",")[0] for line in lines[1:]] == ["One", "Two"]
+
+
+@pytest.mark.anyio
+async def test_shutdown_disposes_the_async_engine(database_file, monkeypatch):
+    import database
+    import main
+
+    path, sync_engine, user_id = database_file
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    monkeypatch.setattr(database, "async_engine", async_engine)
+    async with async_engine.connect() as conn:
+        await conn.exec_driver_sql("SELECT 1")
+    assert async_engine.pool.checkedin() == 1
+
+    async with main.lifespan(app):
+        pass
+
+    # Pooled aiosqlite connections (and their threads) are closed
+    assert async_engine.pool.checkedin() == 0
@@ -229,4 +229,56 @@ def test_delete_task(client):
     )
     
     assert delete_response.status_code == 200
-    assert delete_response.json()["message"] == f"Task {task_data['id']} deleted successfully"
\ No newline at end of file
+    assert delete_response.json()["message"] == f"Task {task_data['id']} deleted successfully"
+
+
+def test_batch_task_operations(client, make_user):
+    user_id, headers = make_user("batchuser_unique17")
+    first = client.post(f"/api/{user_id}/tasks", json={"title": "First"}, headers=headers).json()
+    second = client.post(f"/api/{user_id}/tasks", json={"title": "Second"}, headers=headers).json()
+
+    response = client.post(
+        f"/api/{user_id}/tasks/batch",
+        json={
+            "operations": [
+                {"op": "create", "task": {"title": "Third", "tags": ["batch"]}},
+                {"op": "toggle", "task_id": first["id"]},
+                {"op": "update", "task_id": second["id"], "task": {"title": "Second (edited)"}},
+                {"op": "delete", "task_id": second["id"]},
+                {"op": "toggle", "task_id": second["id"]},
+                {"op": "delete", "task_id": 999999},
+            ]
+        },
+        headers=headers
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [200, 200, 200, 200, 404, 404]
+    assert results[0]["task"]["title"] == "Third"
+    assert results[0]["task"]["tags"] == ["batch"]
+    assert results[1]["task"]["completed"] is True
+
+    remaining = client.get(f"/api/{user_id}/tasks", headers=headers).json()
+    assert sorted(task["title"] for task in remaining) == ["First", "Third"]
+
+
+def test_batch_cannot_touch_other_users_tasks(client, make_user):
+    user_id, headers = make_user("batchowner_unique18")
+    other_id, other_headers = make_user("batchintruder_unique19")
+    task = client.post(f"/api/{user_id}/tasks", json={"title": "Mine"}, headers=headers).json()
+
+    forbidden = client.post(
+        f"/api/{user_id}/tasks/batch",
+        json={"operations": [{"op": "delete", "task_id": task["id"]}]},
+        headers=other_headers
+    )
+    not_found = client.post(
+        f"/api/{other_id}/tasks/batch",
+        json={"operations": [{"op": "delete", "task_id": task["id"]}]},
+        headers=other_headers
+    )
+
+    assert forbidden.status_code == 403
+    assert not_found.json()["results"][0]["status"] == 404
+    assert client.get(f"/api/{user_id}/tasks/{task['id']}", headers=headers).status_code == 200
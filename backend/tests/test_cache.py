@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import dependencies
+from cache import TTLCache
+from dependencies import create_access_token, user_cache, verify_token
+from models import User
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl=60, clock=clock)
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=5)
+    cache.set("capped", 3, ttl=600)
+
+    clock.now = 10
+    assert cache.get("short") is None
+    assert cache.get("default") == 1
+
+    clock.now = 61
+    assert cache.get("default") is None
+    assert cache.get("capped") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 3
+
+
+def test_current_user_is_served_from_cache(client, make_user):
+    user_id, headers = make_user("cacheduser_unique20")
+    user_cache.invalidate(user_id)
+    before = user_cache.stats()
+
+    for _ in range(3):
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    after = user_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+
+
+def test_cached_user_is_invalidated_on_update(client, make_user, test_db):
+    user_id, headers = make_user("renameduser_unique21")
+    client.get("/api/auth/me", headers=headers)
+
+    user = test_db.get(User, user_id)
+    user.username = "renameduser_unique21_new"
+    test_db.commit()
+
+    assert client.get("/api/auth/me", headers=headers).json()["username"] == "renameduser_unique21_new"
+
+
+def test_verified_tokens_skip_repeat_decoding(monkeypatch):
+    calls = []
+    real_decode = dependencies.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(dependencies.jwt, "decode", counting_decode)
+    token = create_access_token({"sub": "42"}, expires_delta=timedelta(minutes=5))
+    unauthorized = HTTPException(status_code=401)
+
+    for _ in range(3):
+        assert verify_token(token, unauthorized).user_id == "42"
+
+    assert calls == [token]
+
+
+def test_cached_token_never_outlives_its_expiry():
+    token = create_access_token({"sub": "42"}, expires_delta=timedelta(seconds=1))
+    unauthorized = HTTPException(status_code=401)
+    assert verify_token(token, unauthorized).user_id == "42"
+
+    # exp has whole-second resolution
+    time.sleep(2.1)
+
+    with pytest.raises(HTTPException):
+        verify_token(token, unauthorized)
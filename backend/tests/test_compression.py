@@ -0,0 +1,135 @@
+import gzip
+import zlib
+
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from compression import CompressionMiddleware, negotiate_encoding
+
+LARGE = "task " * 1000
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(LARGE)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(gzip.compress(LARGE.encode()), headers={"Content-Encoding": "gzip"})
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" * 500, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+async def raw_get(path, accept_encoding):
+    # Raw bytes, without httpx decoding them
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+            chunks = [chunk async for chunk in response.aiter_raw()]
+            return response, chunks
+
+
+def test_negotiation_prefers_zstd_and_respects_q_values():
+    assert negotiate_encoding("gzip, zstd", zstd_available=True) == "zstd"
+    assert negotiate_encoding("gzip, zstd", zstd_available=False) == "gzip"
+    assert negotiate_encoding("zstd;q=0.5, gzip", zstd_available=True) == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity", zstd_available=False) is None
+    assert negotiate_encoding("*", zstd_available=False) == "gzip"
+    assert negotiate_encoding("", zstd_available=True) is None
+
+
+@pytest.mark.anyio
+async def test_large_bodies_are_gzipped():
+    response, chunks = await raw_get("/large", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    body = b"".join(chunks)
+    assert int(response.headers["content-length"]) == len(body) < len(LARGE)
+    assert gzip.decompress(body).decode() == LARGE
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path, accept_encoding", [
+    ("/small", "gzip"),
+    ("/large", "identity"),
+    ("/encoded", "gzip"),
+    ("/image", "gzip"),
+])
+async def test_bodies_left_alone(path, accept_encoding):
+    response, chunks = await raw_get(path, accept_encoding)
+
+    if path == "/encoded":
+        # Passed through untouched, not compressed twice
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(b"".join(chunks)).decode() == LARGE
+    else:
+        assert "content-encoding" not in response.headers
+
+
+@pytest.mark.anyio
+async def test_streaming_bodies_are_compressed_chunk_by_chunk():
+    # Drive the ASGI app directly: httpx joins the chunks of a response
+    messages = []
+
+    async def receive():
+        # The client never disconnects; Starlette cancels this once the
+        # response is complete
+        await anyio.sleep_forever()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")], "http_version": "1.1", "scheme": "http",
+        "server": ("test", 80), "client": ("test", 1234), "root_path": "",
+    }
+    await make_app()(scope, receive, send)
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # Each chunk is flushed, so it decodes on its own as it arrives
+    decoder = zlib.decompressobj(31)
+    decoded = [decoder.decompress(message["body"]) for message in messages[1:]]
+    assert decoded[:3] == [b"chunk 0\n", b"chunk 1\n", b"chunk 2\n"]
+    assert decoder.flush() == b"" and decoder.eof
+
+
+def test_task_lists_are_compressed(client, make_user):
+    user_id, headers = make_user("gzipuser_unique26")
+    for i in range(20):
+        client.post(f"/api/{user_id}/tasks", json={"title": f"Task {i}", "description": "details " * 20}, headers=headers)
+
+    response = client.get(f"/api/{user_id}/tasks", headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 20
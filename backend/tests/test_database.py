@@ -0,0 +1,66 @@
+import asyncio
+
+from sqlalchemy import text
+
+from database import DB_POOL_SIZE, build_async_engine, build_engine
+
+
+def read_pragmas(conn):
+    return {
+        name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+    }
+
+
+def test_sqlite_profile_is_applied_to_every_connection(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+
+    with engine.connect() as first, engine.connect() as second:
+        assert read_pragmas(first) == read_pragmas(second)
+        pragmas = read_pragmas(first)
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["busy_timeout"] == 5000
+    assert pragmas["cache_size"] == -65536
+    assert pragmas["mmap_size"] > 0
+    assert engine.pool.size() == DB_POOL_SIZE
+    engine.dispose()
+
+
+def test_sqlite_profile_can_be_disabled(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'default.db'}", profile=False)
+
+    with engine.connect() as conn:
+        assert read_pragmas(conn)["journal_mode"] == "delete"
+    engine.dispose()
+
+
+def test_async_engine_uses_the_same_profile(tmp_path):
+    async def async_pragmas():
+        engine = build_async_engine(f"sqlite:///{tmp_path / 'async.db'}")
+        async with engine.connect() as conn:
+            pragmas = await conn.run_sync(read_pragmas)
+        await engine.dispose()
+        return pragmas
+
+    pragmas = asyncio.run(async_pragmas())
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["busy_timeout"] == 5000
+
+
+def test_schema_is_created_on_startup_not_at_import(tmp_path, monkeypatch):
+    from sqlalchemy import inspect
+
+    import main
+
+    engine = build_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    monkeypatch.setattr(main, "engine", engine)
+    assert inspect(engine).get_table_names() == []
+
+    main._prepare_database()
+
+    tables = inspect(engine).get_table_names()
+    assert {"users", "tasks", "task_tags", "schema_migrations"} <= set(tables)
+    engine.dispose()
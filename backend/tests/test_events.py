@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from events import TaskEventBroker, broker, event_stream
+
+
+def test_publish_reaches_only_the_users_streams():
+    events = TaskEventBroker(max_connections=10, max_per_user=5, buffer_size=10)
+    first, second, other = events.subscribe(1), events.subscribe(1), events.subscribe(2)
+
+    events.publish(1, "task.created", {"id": 7})
+
+    assert first.get_nowait() == ("task.created", {"id": 7})
+    assert second.get_nowait() == ("task.created", {"id": 7})
+    assert other.empty()
+
+
+def test_slow_subscriber_is_told_to_resync_and_dropped():
+    events = TaskEventBroker(max_connections=10, max_per_user=5, buffer_size=2)
+    slow = events.subscribe(1)
+
+    for task_id in range(3):
+        events.publish(1, "task.updated", {"id": task_id})
+
+    assert slow.qsize() == 1
+    assert events.connections == 0
+    assert events.dropped == 1
+
+    async def read_stream():
+        return [chunk async for chunk in event_stream(events, 1, slow, heartbeat=1)]
+
+    chunks = asyncio.run(read_stream())
+    assert chunks[-1].startswith("event: resync\n")
+
+
+def test_connection_caps():
+    events = TaskEventBroker(max_connections=3, max_per_user=2, buffer_size=10)
+    events.subscribe(1)
+    events.subscribe(1)
+    with pytest.raises(HTTPException) as per_user:
+        events.subscribe(1)
+    assert per_user.value.status_code == 503
+
+    events.subscribe(2)
+    with pytest.raises(HTTPException):
+        events.subscribe(3)
+    assert events.connections == 3
+
+
+def test_stream_formats_events_and_heartbeats():
+    events = TaskEventBroker(max_connections=10, max_per_user=5, buffer_size=10)
+    queue = events.subscribe(1)
+
+    async def read_stream():
+        stream = event_stream(events, 1, queue, heartbeat=0.01)
+        chunks = [await stream.__anext__()]
+        chunks.append(await stream.__anext__())
+        events.publish(1, "task.deleted", {"id": 3})
+        chunks.append(await stream.__anext__())
+        await stream.aclose()
+        return chunks
+
+    assert asyncio.run(read_stream()) == [
+        "retry: 3000\n\n",
+        ": keep-alive\n\n",
+        'event: task.deleted\ndata: {"id":3}\n\n',
+    ]
+    assert events.connections == 0
+
+
+def test_task_writes_are_published(client, make_user):
+    user_id, headers = make_user("eventuser_unique13")
+    queue = broker.subscribe(user_id)
+    try:
+        task = client.post(f"/api/{user_id}/tasks", json={"title": "Live"}, headers=headers).json()
+        client.patch(f"/api/{user_id}/tasks/{task['id']}/toggle", headers=headers)
+        client.post(f"/api/{user_id}/tasks/batch", json={"operations": [
+            {"op": "update", "task_id": task["id"], "task": {"title": "Renamed"}},
+            {"op": "toggle", "task_id": 10**9},
+        ]}, headers=headers)
+        client.delete(f"/api/{user_id}/tasks/{task['id']}", headers=headers)
+
+        received = []
+        while not queue.empty():
+            received.append(queue.get_nowait())
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+    assert [event for event, _ in received] == ["task.created", "task.toggled", "task.updated", "task.deleted"]
+    assert received[1][1]["completed"] is True
+    assert received[2][1]["title"] == "Renamed"
+    assert received[3][1] == {"id": task["id"]}
+
+
+def test_event_stream_rejects_other_users_and_full_servers(client, make_user):
+    user_id, headers = make_user("eventcap_unique14")
+    other_id, _ = make_user("eventcapother_unique15")
+    assert client.get(f"/api/{other_id}/tasks/events", headers=headers).status_code == 403
+
+    queues = [broker.subscribe(user_id) for _ in range(broker.max_per_user)]
+    try:
+        response = client.get(f"/api/{user_id}/tasks/events", headers=headers)
+    finally:
+        for queue in queues:
+            broker.unsubscribe(user_id, queue)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+def test_event_stream_accepts_a_scoped_token_in_the_url(client, make_user):
+    user_id, headers = make_user("eventtoken_unique41")
+    other_id, other_headers = make_user("eventtokenother_unique42")
+    url = f"/api/{user_id}/tasks/events"
+    response = client.post(f"{url}/token", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["expires_in"] == 60
+    token = response.json()["token"]
+    other_token = client.post(f"/api/{other_id}/tasks/events/token", headers=other_headers).json()["token"]
+    assert client.post(f"/api/{other_id}/tasks/events/token", headers=headers).status_code == 403
+
+    # Full server: authenticated requests get as far as subscribing (503)
+    queues = [broker.subscribe(user_id) for _ in range(broker.max_per_user)]
+    try:
+        assert client.get(url, params={"token": token}).status_code == 503
+        assert client.get(url).status_code == 401
+        assert client.get(url, params={"token": other_token}).status_code == 403
+        # Access tokens stay out of URLs; stream tokens only open streams
+        assert client.get(url, params={"token": headers["Authorization"].split()[1]}).status_code == 401
+    finally:
+        for queue in queues:
+            broker.unsubscribe(user_id, queue)
+    stream_headers = {"Authorization": f"Bearer {token}"}
+    assert client.get(f"/api/{user_id}/tasks", headers=stream_headers).status_code == 401
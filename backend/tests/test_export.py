@@ -0,0 +1,85 @@
+import csv
+import gzip
+import io
+
+import orjson
+
+import tasks_router
+
+
+def make_tasks(client, make_user, username, count):
+    user_id, headers = make_user(username)
+    for i in range(count):
+        client.post(
+            f"/api/{user_id}/tasks",
+            json={"title": f"Export {i}", "tags": ["work", "a,b"] if i % 2 else [], "due_date": "2030-01-01" if i == 0 else None},
+            headers=headers
+        )
+    return f"/api/{user_id}/tasks/export", headers
+
+
+def test_ndjson_export_matches_the_task_list(client, make_user):
+    url, headers = make_tasks(client, make_user, "exportuser_unique31", 5)
+
+    response = client.get(url, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.ndjson"'
+    exported = [orjson.loads(line) for line in response.text.splitlines()]
+    listed = client.get(url.removesuffix("/export"), headers=headers).json()
+    assert exported == listed
+    assert exported[1]["tags"] == ["work", "a,b"]
+
+
+def test_csv_export_has_a_header_and_one_row_per_task(client, make_user):
+    url, headers = make_tasks(client, make_user, "exportcsv_unique32", 3)
+
+    response = client.get(url, params={"format": "csv"}, headers=headers)
+
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == ["Export 0", "Export 1", "Export 2"]
+    assert rows[0]["due_date"] == "2030-01-01T00:00:00"
+    assert rows[0]["completed"] == "false"
+    assert orjson.loads(rows[1]["tags"]) == ["work", "a,b"]
+    assert rows[2]["description"] == ""
+
+
+def test_gzip_export_is_a_gzip_file(client, make_user):
+    url, headers = make_tasks(client, make_user, "exportgzip_unique33", 3)
+
+    response = client.get(url, params={"gzip": True}, headers=headers)
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.ndjson.gz"'
+    assert "content-encoding" not in response.headers
+    lines = gzip.decompress(response.content).splitlines()
+    assert [orjson.loads(line)["title"] for line in lines] == ["Export 0", "Export 1", "Export 2"]
+
+
+def test_export_reads_the_cursor_in_batches(client, make_user, monkeypatch):
+    url, headers = make_tasks(client, make_user, "exportbatch_unique34", 5)
+    monkeypatch.setattr(tasks_router, "EXPORT_BATCH_SIZE", 2)
+    batches = []
+    fetch = tasks_router._fetch_export_batch
+
+    def counting_fetch(db, result):
+        tasks = fetch(db, result)
+        batches.append(len(tasks))
+        return tasks
+
+    monkeypatch.setattr(tasks_router, "_fetch_export_batch", counting_fetch)
+    response = client.get(url, headers=headers)
+
+    assert len(response.text.splitlines()) == 5
+    assert batches == [2, 2, 1, 0]
+
+
+def test_export_is_limited_to_the_owner(client, make_user):
+    url, headers = make_tasks(client, make_user, "exportowner_unique35", 1)
+    other_id, other_headers = make_user("exportother_unique36")
+
+    assert client.get(url, headers=other_headers).status_code == 403
+    assert client.get(f"/api/{other_id}/tasks/export", headers=other_headers).text == ""
+    assert client.get(url, params={"format": "xml"}, headers=headers).status_code == 422
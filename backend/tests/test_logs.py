@@ -0,0 +1,80 @@
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+import dependencies
+import logs
+from dependencies import create_access_token
+from logs import JsonFormatter, RateLimitFilter, _QueueHandler
+from test_query_plans import record_statements
+
+
+def make_record(msg, *args, **extra):
+    record = logging.makeLogRecord({"name": "auth", "levelno": logging.WARNING, "levelname": "WARNING", "msg": msg, "args": args})
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rate_limit_drops_repeats_and_reports_them(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(logs.time, "monotonic", lambda: now[0])
+    rate_limit = RateLimitFilter(limit=2, window=60)
+
+    allowed = [rate_limit.filter(make_record("Token rejected")) for _ in range(5)]
+    # Different templates are limited separately
+    assert rate_limit.filter(make_record("Token has no subject"))
+
+    assert allowed == [True, True, False, False, False]
+    now[0] += 60
+    record = make_record("Token rejected")
+    assert rate_limit.filter(record)
+    assert record.suppressed == 3
+
+
+def test_queued_records_format_as_json_lines():
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.setFormatter(JsonFormatter())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record("Lookup for %s failed", "alice", user_id=7)
+        record.exc_info = sys.exc_info()
+        handler.emit(record)
+
+    entry = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+
+    assert entry["message"] == "Lookup for alice failed"
+    assert entry["level"] == "WARNING"
+    assert entry["user_id"] == 7
+    assert "ValueError: boom" in entry["exc_info"]
+    assert "boom" not in entry["message"]
+
+
+@pytest.fixture
+def auth_logs(caplog):
+    # Other tests may have used up this window's allowance
+    for log_filter in dependencies.logger.filters:
+        log_filter._windows.clear()
+    with caplog.at_level(logging.WARNING, logger="dependencies"):
+        yield caplog
+
+
+def test_unknown_user_is_logged_without_scanning_users(client, auth_logs):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '987654'})}"}
+
+    statements = record_statements(lambda: client.get("/api/auth/me", headers=headers))
+
+    assert len([s for s, _ in statements if "FROM users" in s]) == 1
+    record = next(r for r in auth_logs.records if r.getMessage() == "Token subject does not exist")
+    assert record.user_id == 987654
+
+
+def test_bad_tokens_are_logged_without_the_token(client, auth_logs):
+    client.get("/api/auth/me", headers={"Authorization": "Bearer not.a.jwt"})
+
+    assert "Token rejected" in [r.getMessage() for r in auth_logs.records]
+    assert not any("not.a.jwt" in json.dumps(vars(r), default=str) for r in auth_logs.records)
@@ -0,0 +1,90 @@
+import re
+
+from metrics import Histogram, _histogram_lines
+
+
+def metric_value(text, name, **labels):
+    # Value of the sample whose labels include all of the given ones
+    for line in text.splitlines():
+        if not line.startswith(name + "{") and not line.startswith(name + " "):
+            continue
+        if all(f'{key}="{value}"' in line for key, value in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    text = "\n".join(_histogram_lines("h", histogram))
+
+    assert 'h_bucket{le="0.1"} 2' in text
+    assert 'h_bucket{le="1.0"} 3' in text
+    assert 'h_bucket{le="+Inf"} 4' in text
+    assert "h_count 4" in text
+
+
+def test_metrics_report_requests_queries_and_caches(client, make_user):
+    user_id, headers = make_user("metricsuser_unique27")
+    client.post(f"/api/{user_id}/tasks", json={"title": "Measured"}, headers=headers)
+    client.get(f"/api/{user_id}/tasks", headers=headers)
+    client.get(f"/api/{user_id}/tasks", headers=headers)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    # Labelled by route template, not by concrete path
+    route = "/api/{user_id}/tasks"
+    assert metric_value(text, "http_request_duration_seconds_count", method="GET", route=route, status="200") >= 2
+    assert f"/api/{user_id}/tasks" not in text
+    assert metric_value(text, "db_request_queries_count", route=route) >= 3
+    assert metric_value(text, "db_request_queries_sum", route=route) > 0
+    assert metric_value(text, "db_queries_total") > 0
+    # The /metrics request itself is in flight while rendering
+    assert metric_value(text, "http_requests_in_flight") >= 1
+    assert 0 < metric_value(text, "auth_cache_hit_ratio", cache="token") <= 1
+    assert metric_value(text, "auth_cache_size", cache="user") >= 1
+
+
+def test_unmatched_paths_share_one_label(client):
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+
+    text = client.get("/metrics").text
+
+    assert metric_value(text, "http_request_duration_seconds_count", route="unmatched", status="404") >= 2
+    assert not re.search(r'route="/no/such', text)
+
+
+def test_health_checks_the_database(client, monkeypatch):
+    assert client.get("/health").json()["status"] == "healthy"
+
+    import main
+
+    def broken():
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(main, "_check_database", broken)
+    response = client.get("/health")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "unhealthy"
+
+
+def test_timed_pools_log_under_sqlalchemy(tmp_path):
+    import logging
+
+    from database import build_async_engine, build_engine
+
+    engine = build_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    async_engine = build_async_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+
+    assert engine.pool.logger.name == "sqlalchemy.pool.impl.QueuePool"
+    assert async_engine.sync_engine.pool.logger.name == "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+    # SQLAlchemy's WARN default applies, whatever level the app logs at
+    assert not engine.pool.logger.isEnabledFor(logging.INFO)
+    engine.dispose()
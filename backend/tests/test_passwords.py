@@ -0,0 +1,76 @@
+import threading
+
+import anyio
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+import passwords
+from models import User
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_hashing_does_not_hold_request_threads():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    borrowed = []
+
+    async with anyio.create_task_group() as task_group:
+        task_group.start_soon(passwords.hash_password_async, "s3cret-password")
+        # Sample the request threadpool while the hash is in flight
+        for _ in range(5):
+            await anyio.sleep(0.01)
+            borrowed.append(limiter.borrowed_tokens)
+
+    assert max(borrowed) == 0
+
+
+@pytest.mark.anyio
+async def test_hash_queue_is_bounded(monkeypatch):
+    monkeypatch.setattr(passwords, "_queue_slots", threading.BoundedSemaphore(1))
+    passwords._queue_slots.acquire()
+
+    with pytest.raises(HTTPException) as excinfo:
+        await passwords.hash_password_async("s3cret-password")
+
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers["Retry-After"] == "1"
+
+
+@pytest.mark.anyio
+async def test_broken_pool_is_replaced(monkeypatch):
+    monkeypatch.setattr(passwords, "_pool", None)
+    pool = passwords._get_pool()
+    await passwords.hash_password_async("s3cret-password")
+    # A worker dying breaks every later call on that pool
+    for process in list(pool._processes.values()):
+        process.kill()
+        process.join()
+
+    hashed = await passwords.hash_password_async("s3cret-password")
+
+    assert passwords.verify_password("s3cret-password", hashed)
+    assert passwords._pool is not pool
+    passwords.shutdown_pool()
+
+
+def test_login_rehashes_passwords_with_a_different_cost(client, test_db):
+    cheap_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpassword123")
+    user = User(username="rehashuser_unique22", email="rehash22@example.com", hashed_password=cheap_hash)
+    test_db.add(user)
+    test_db.commit()
+
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "rehash22@example.com", "password": "testpassword123"}
+    )
+
+    assert response.status_code == 200
+    test_db.refresh(user)
+    assert user.hashed_password != cheap_hash
+    assert passwords.pwd_context.identify(user.hashed_password) == "bcrypt"
+    assert not passwords.pwd_context.needs_update(user.hashed_password)
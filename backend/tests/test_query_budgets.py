@@ -0,0 +1,122 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import profiler
+from conftest import engine
+from profiler import QueryProfileMiddleware, profile_queries, query_budget
+
+# Most statements each endpoint may issue for an authenticated user whose
+# token and user are already cached. Raise one only with a reason.
+BUDGETS = {
+    "create": 3,  # version bump, INSERT ... RETURNING, tags
+    "list": 3,
+    "detail": 3,
+    "update": 2,  # version bump, UPDATE ... RETURNING (2 more when tags change)
+    "toggle": 2,  # version bump, UPDATE ... RETURNING
+    "delete": 4,  # DELETE ... RETURNING, tags, version bump, tombstone
+    "stats": 2,
+}
+
+
+def make_task(client, make_user, username):
+    user_id, headers = make_user(username)
+    url = f"/api/{user_id}/tasks"
+    task_id = client.post(url, json={"title": "Budgeted", "tags": ["work"]}, headers=headers).json()["id"]
+    return url, f"{url}/{task_id}", headers
+
+
+@pytest.mark.parametrize("endpoint", list(BUDGETS))
+def test_endpoints_stay_within_query_budget(client, make_user, endpoint):
+    url, task_url, headers = make_task(client, make_user, f"budget{endpoint}_unique28")
+    calls = {
+        "create": lambda: client.post(url, json={"title": "New", "tags": ["home"]}, headers=headers),
+        "list": lambda: client.get(url, headers=headers),
+        "detail": lambda: client.get(task_url, headers=headers),
+        "update": lambda: client.put(task_url, json={"title": "Renamed"}, headers=headers),
+        "toggle": lambda: client.patch(f"{task_url}/toggle", headers=headers),
+        "delete": lambda: client.delete(task_url, headers=headers),
+        "stats": lambda: client.get(f"{url}/stats", headers=headers),
+    }
+
+    with query_budget(BUDGETS[endpoint]) as profile:
+        response = calls[endpoint]()
+
+    assert response.status_code == 200
+    assert len(profile) > 0
+
+
+def test_budget_failure_lists_the_statements():
+    with pytest.raises(AssertionError, match="Query budget of 1 exceeded") as failure:
+        with query_budget(1):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+    assert "SELECT 2" in str(failure.value)
+
+
+def test_profiles_record_statement_timing_and_rows(test_db):
+    with profile_queries() as outer:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            with profile_queries() as inner:
+                conn.execute(text("UPDATE users SET username = username WHERE id = -1"))
+
+    assert [query.statement for query in outer.queries] == ["SELECT 1", "UPDATE users SET username = username WHERE id = -1"]
+    assert len(inner) == 1
+    assert inner.queries[0].rows == 0
+    assert outer.queries[0].rows is None
+    assert all(query.seconds >= 0 for query in outer.queries)
+
+
+def test_slow_statements_are_logged(monkeypatch, caplog):
+    monkeypatch.setattr(profiler, "DB_SLOW_QUERY_SECONDS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="profiler"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 42"))
+
+    record = next(r for r in caplog.records if r.getMessage() == "Slow query")
+    assert record.statement == "SELECT 42"
+
+
+def test_middleware_logs_requests_over_budget(caplog):
+    app = FastAPI()
+    app.add_middleware(QueryProfileMiddleware, budget=1)
+
+    @app.get("/items/{item_id}")
+    def chatty(item_id: int):
+        with engine.connect() as conn:
+            for _ in range(item_id):
+                conn.execute(text("SELECT 1"))
+        return {}
+
+    with caplog.at_level(logging.WARNING, logger="profiler"):
+        TestClient(app).get("/items/1")
+        TestClient(app).get("/items/3")
+
+    records = [r for r in caplog.records if r.getMessage() == "Request exceeded query budget"]
+    assert len(records) == 1
+    assert records[0].route == "/items/{item_id}"
+    assert records[0].statements == ["SELECT 1"] * 3
+
+
+def test_statements_are_timed_once_for_metrics_and_profiles(test_db):
+    from metrics import RequestStats, _request_stats
+
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        with profile_queries() as profile:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+    finally:
+        _request_stats.reset(token)
+
+    # One measurement feeds both
+    assert stats.queries == len(profile) == 1
+    assert stats.query_seconds == profile.seconds
@@ -0,0 +1,116 @@
+import re
+
+from sqlalchemy import event
+
+from conftest import engine
+
+# A SCAN of one of our tables reads every row (or every index entry). FTS5
+# lookups also show up as SCAN, but of the virtual table.
+FULL_SCAN = re.compile(r"^SCAN (users|tasks|task_tags|task_versions|task_tombstones)\b")
+
+
+def record_statements(client_calls):
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        client_calls()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return statements
+
+
+def full_scans(statements):
+    scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                continue
+            for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                if FULL_SCAN.match(row[-1]):
+                    scans.append((row[-1], statement))
+    return scans
+
+
+def query_plans(statements, table="tasks"):
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement:
+                plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                plans.append(plan)
+    return plans
+
+
+def test_task_endpoints_never_scan_a_whole_table(client, make_user):
+    user_id, headers = make_user("planuser_unique17")
+    other_id, other_headers = make_user("planother_unique18")
+    url = f"/api/{user_id}/tasks"
+
+    def calls():
+        created = [
+            client.post(url, json={"title": f"Plan {i}", "priority": "high" if i % 2 else "low", "tags": ["work"]}, headers=headers).json()
+            for i in range(4)
+        ]
+        client.post(f"/api/{other_id}/tasks", json={"title": "Other"}, headers=other_headers)
+        task_id = created[0]["id"]
+
+        client.get(url, headers=headers)
+        client.get(url, params={"completed": False}, headers=headers)
+        client.get(url, params={"priority": "high"}, headers=headers)
+        client.get(url, params={"completed": False, "priority": "high"}, headers=headers)
+        client.get(url, params={"tag": ["work", "home"], "tag_mode": "all"}, headers=headers)
+        client.get(url, params={"due_from": "2030-01-01", "due_to": "2030-02-01"}, headers=headers)
+        client.get(url, params={"overdue": True}, headers=headers)
+        client.get(url, params={"search": "plan"}, headers=headers)
+        cursor = client.get(url, params={"limit": 2}, headers=headers).headers["X-Next-Cursor"]
+        client.get(url, params={"limit": 2, "cursor": cursor}, headers=headers)
+        client.get(f"{url}/{task_id}", headers=headers)
+        client.put(f"{url}/{task_id}", json={"title": "Renamed", "tags": ["home"]}, headers=headers)
+        client.patch(f"{url}/{task_id}/toggle", headers=headers)
+        client.post(f"{url}/batch", json={"operations": [
+            {"op": "toggle", "task_id": created[1]["id"]},
+            {"op": "delete", "task_id": created[2]["id"]},
+        ]}, headers=headers)
+        client.delete(f"{url}/{task_id}", headers=headers)
+        client.get(f"{url}/changes", params={"since": 1}, headers=headers)
+        client.get(f"{url}/stats", headers=headers)
+        client.get(f"{url}/export", headers=headers)
+
+    statements = record_statements(calls)
+
+    assert any("FROM tasks" in statement for statement, _ in statements)
+    assert full_scans(statements) == []
+
+
+def test_sorted_pages_read_rows_in_index_order(client, make_user):
+    user_id, headers = make_user("sortplanuser_unique24")
+    url = f"/api/{user_id}/tasks"
+    client.post(url, json={"title": "Sorted", "due_date": "2030-01-01"}, headers=headers)
+
+    def calls():
+        for sort in ("created_at", "due_date", "priority", "title"):
+            for order in ("asc", "desc"):
+                client.get(url, params={"sort": sort, "order": order, "limit": 10}, headers=headers)
+
+    plans = query_plans(record_statements(calls))
+
+    # A temporary B-tree would mean reading every matching row to sort them
+    assert len(plans) == 8
+    for plan in plans:
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_list_tags_are_read_through_the_task_tags_primary_key(client, make_user):
+    user_id, headers = make_user("tagplanuser_unique40")
+    url = f"/api/{user_id}/tasks"
+    for i in range(3):
+        client.post(url, json={"title": f"Tagged {i}", "tags": ["b", "a", f"t{i}"]}, headers=headers)
+
+    plans = query_plans(record_statements(lambda: client.get(url, headers=headers)), table="task_tags")
+
+    assert plans == [["SEARCH task_tags USING INDEX sqlite_autoindex_task_tags_1 (task_id=?)"]]
@@ -0,0 +1,568 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, text
+
+from conftest import TestingSessionLocal, engine
+from pagination import encode_cursor
+from versions import compact_tombstones
+
+
+def create_tasks(client, user_id, headers, tasks):
+    created = []
+    for task in tasks:
+        response = client.post(f"/api/{user_id}/tasks", json=task, headers=headers)
+        assert response.status_code == 200
+        created.append(response.json())
+    return created
+
+
+def fetch_all_pages(client, url, headers, params):
+    # Follow X-Next-Cursor until the last page
+    pages = []
+    params = dict(params)
+    while True:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            return pages
+        params["cursor"] = next_cursor
+
+
+def test_cursor_pagination_walks_every_task_once(client, make_user):
+    user_id, headers = make_user("pageuser_unique7")
+    created = create_tasks(client, user_id, headers, [{"title": f"Task {i}"} for i in range(7)])
+
+    pages = fetch_all_pages(client, f"/api/{user_id}/tasks", headers, {"limit": 3})
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [task["id"] for page in pages for task in page] == [task["id"] for task in created]
+
+
+def test_cursor_pagination_keeps_filters(client, make_user):
+    user_id, headers = make_user("pagefilteruser_unique8")
+    create_tasks(client, user_id, headers, [
+        {"title": f"Task {i}", "priority": "high" if i % 2 else "low"} for i in range(6)
+    ])
+
+    pages = fetch_all_pages(client, f"/api/{user_id}/tasks", headers, {"limit": 2, "priority": "high"})
+
+    tasks = [task for page in pages for task in page]
+    assert len(tasks) == 3
+    assert all(task["priority"] == "high" for task in tasks)
+
+
+def test_invalid_cursor_is_rejected(client, make_user):
+    user_id, headers = make_user("badcursoruser_unique9")
+
+    response = client.get(
+        f"/api/{user_id}/tasks",
+        params={"limit": 2, "cursor": "not-a-cursor"},
+        headers=headers
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("sort, sort_value, row_id", [
+    ("id", None, True),
+    ("id", None, "1"),
+    ("title", ["a"], 1),
+    ("title", {"a": 1}, 1),
+    ("title", True, 1),
+])
+def test_forged_cursor_values_are_rejected(client, make_user, sort, sort_value, row_id):
+    user_id, headers = make_user(f"forgedcursor_{sort}_{type(sort_value).__name__}_{type(row_id).__name__}")
+
+    response = client.get(
+        f"/api/{user_id}/tasks",
+        params={"limit": 2, "sort": sort, "cursor": encode_cursor(sort, sort_value, row_id)},
+        headers=headers
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_search_matches_prefixes_and_ranks_title_hits_first(client, make_user):
+    user_id, headers = make_user("searchuser_unique10")
+    other_id, other_headers = make_user("searchother_unique11")
+    create_tasks(client, user_id, headers, [
+        {"title": "Call plumber", "description": "about the milk fridge"},
+        {"title": "Buy milk", "description": "semi-skimmed"},
+        {"title": "Water plants"},
+    ])
+    create_tasks(client, other_id, other_headers, [{"title": "Milk the cows"}])
+
+    response = client.get(f"/api/{user_id}/tasks", params={"search": "mil"}, headers=headers)
+
+    assert response.status_code == 200
+    assert [task["title"] for task in response.json()] == ["Buy milk", "Call plumber"]
+
+
+def test_search_index_follows_updates_and_deletes(client, make_user):
+    user_id, headers = make_user("searchsyncuser_unique12")
+    renamed, deleted = create_tasks(client, user_id, headers, [
+        {"title": "Draft report"},
+        {"title": "Draft invoice"},
+    ])
+    client.put(f"/api/{user_id}/tasks/{renamed['id']}", json={"title": "Final report"}, headers=headers)
+    client.delete(f"/api/{user_id}/tasks/{deleted['id']}", headers=headers)
+
+    def search(term):
+        response = client.get(f"/api/{user_id}/tasks", params={"search": term}, headers=headers)
+        return [task["id"] for task in response.json()]
+
+    assert search("draft") == []
+    assert search("final report") == [renamed["id"]]
+
+
+def test_search_results_can_be_paginated(client, make_user):
+    user_id, headers = make_user("searchpageuser_unique13")
+    create_tasks(client, user_id, headers, [{"title": f"Errand {i}"} for i in range(5)])
+
+    pages = fetch_all_pages(client, f"/api/{user_id}/tasks", headers, {"search": "errand", "limit": 2})
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert len({task["id"] for page in pages for task in page}) == 5
+
+
+def test_search_pages_survive_writes_between_fetches(client, make_user):
+    user_id, headers = make_user("searchstableuser_unique37")
+    other_id, other_headers = make_user("searchstableother_unique38")
+    created = create_tasks(client, user_id, headers, [{"title": f"Quarterly report {i}"} for i in range(5)])
+    url = f"/api/{user_id}/tasks"
+
+    first = client.get(url, params={"search": "report", "limit": 2}, headers=headers)
+    # Writes by anyone change every row's bm25 score
+    create_tasks(client, other_id, other_headers, [{"title": f"Unrelated {i}"} for i in range(30)])
+    rest = fetch_all_pages(client, url, headers, {"search": "report", "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+
+    seen = [task["id"] for task in first.json()] + [task["id"] for page in rest for task in page]
+    assert seen == [task["id"] for task in created]
+
+
+def test_tags_round_trip_in_order(client, make_user):
+    user_id, headers = make_user("taguser_unique14")
+    task, = create_tasks(client, user_id, headers, [{"title": "Tagged", "tags": ["work", "urgent", "work"]}])
+    assert task["tags"] == ["work", "urgent"]
+
+    response = client.put(
+        f"/api/{user_id}/tasks/{task['id']}",
+        json={"tags": ["home", "work"]},
+        headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["tags"] == ["home", "work"]
+    assert client.get(f"/api/{user_id}/tasks/{task['id']}", headers=headers).json()["tags"] == ["home", "work"]
+
+
+def test_tag_filter_any_and_all(client, make_user):
+    user_id, headers = make_user("tagfilteruser_unique15")
+    other_id, other_headers = make_user("tagfilterother_unique16")
+    both, work_only, _ = create_tasks(client, user_id, headers, [
+        {"title": "Both", "tags": ["work", "urgent"]},
+        {"title": "Work only", "tags": ["work"]},
+        {"title": "Untagged"},
+    ])
+    create_tasks(client, other_id, other_headers, [{"title": "Not mine", "tags": ["work", "urgent"]}])
+
+    def filtered(params):
+        response = client.get(f"/api/{user_id}/tasks", params=params, headers=headers)
+        assert response.status_code == 200
+        return [task["id"] for task in response.json()]
+
+    assert filtered({"tag": ["work", "urgent"]}) == [both["id"], work_only["id"]]
+    assert filtered({"tag": ["work", "urgent"], "tag_mode": "all"}) == [both["id"]]
+    assert filtered({"tag": "missing"}) == []
+
+
+def test_json_tags_are_migrated_to_task_tags():
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import StaticPool
+    from database import Base
+    from migrations import run_migrations
+
+    legacy_engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=legacy_engine)
+    with legacy_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'legacy', 'legacy@example.com', 'x')"
+        ))
+        conn.execute(text(
+            "INSERT INTO tasks (id, title, completed, priority, owner_id, tags) "
+            "VALUES (1, 'Old', 0, 'medium', 1, '[\"b\", \"a\"]'), (2, 'Broken', 0, 'medium', 1, 'not json')"
+        ))
+
+    run_migrations(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        tags = conn.execute(text("SELECT task_id, tag, owner_id FROM task_tags ORDER BY position")).fetchall()
+        legacy = conn.execute(text("SELECT tags FROM tasks WHERE tags IS NOT NULL")).fetchall()
+    assert [tuple(row) for row in tags] == [(1, "b", 1), (1, "a", 1)]
+    assert legacy == []
+
+
+def test_full_sync_includes_tasks_from_before_change_tracking():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+    from database import Base
+    from migrations import run_migrations
+    from tasks_router import _list_changes
+
+    legacy_engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=legacy_engine)
+    run_migrations(legacy_engine)
+    with legacy_engine.begin() as conn:
+        # Rows as migration 4 leaves them: change_seq 0 and no task_versions row
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'legacy', 'legacy@example.com', 'x')"
+        ))
+        conn.execute(text(
+            "INSERT INTO tasks (id, title, completed, priority, owner_id, change_seq) VALUES (1, 'Old', 0, 'medium', 1, 0)"
+        ))
+
+    with Session(legacy_engine) as db:
+        changes = _list_changes(db, 1, 0)
+
+    assert [task.title for task in changes.changed] == ["Old"]
+    assert changes.deleted == [] and changes.sync_token == 0
+
+
+def test_task_reads_revalidate_with_etags(client, make_user):
+    user_id, headers = make_user("etaguser_unique9")
+    task = create_tasks(client, user_id, headers, [{"title": "Cached"}])[0]
+    url = f"/api/{user_id}/tasks"
+
+    first = client.get(url, headers=headers)
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+    # Each query string is its own representation
+    assert client.get(url, params={"completed": True}, headers=headers).headers["ETag"] != etag
+
+    detail = client.get(f"{url}/{task['id']}", headers=headers)
+    not_modified = client.get(f"{url}/{task['id']}", headers={**headers, "If-None-Match": detail.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    client.patch(f"{url}/{task['id']}/toggle", headers=headers)
+    changed = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_not_modified_does_not_read_tasks(client, make_user):
+    user_id, headers = make_user("etagquery_unique10")
+    create_tasks(client, user_id, headers, [{"title": "One"}])
+    url = f"/api/{user_id}/tasks"
+    etag = client.get(url, headers=headers).headers["ETag"]
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 304
+    assert not any("FROM tasks" in statement for statement in statements)
+
+
+def test_changes_returns_only_what_changed_since_the_token(client, make_user):
+    user_id, headers = make_user("syncuser_unique11")
+    kept, toggled, removed = create_tasks(client, user_id, headers, [{"title": t} for t in ("Kept", "Toggled", "Removed")])
+    url = f"/api/{user_id}/tasks/changes"
+
+    full = client.get(url, headers=headers).json()
+    assert [task["id"] for task in full["changed"]] == [kept["id"], toggled["id"], removed["id"]]
+    assert full["deleted"] == []
+
+    client.patch(f"/api/{user_id}/tasks/{toggled['id']}/toggle", headers=headers)
+    client.delete(f"/api/{user_id}/tasks/{removed['id']}", headers=headers)
+    delta = client.get(url, params={"since": full["sync_token"]}, headers=headers).json()
+    assert [task["id"] for task in delta["changed"]] == [toggled["id"]]
+    assert delta["changed"][0]["completed"] is True
+    assert delta["deleted"] == [removed["id"]]
+
+    unchanged = client.get(url, params={"since": delta["sync_token"]}, headers=headers).json()
+    assert unchanged == {"changed": [], "deleted": [], "sync_token": delta["sync_token"]}
+
+
+def test_deletions_survive_task_id_reuse_by_another_user(client, make_user):
+    user_id, headers = make_user("reuseuser_unique40")
+    other_id, other_headers = make_user("reuseother_unique41")
+    task, = create_tasks(client, user_id, headers, [{"title": "Newest task"}])
+    url = f"/api/{user_id}/tasks/changes"
+    token = client.get(url, headers=headers).json()["sync_token"]
+
+    client.delete(f"/api/{user_id}/tasks/{task['id']}", headers=headers)
+    # SQLite hands the freed highest id to the next insert, whoever makes it
+    reused, = create_tasks(client, other_id, other_headers, [{"title": "Same id"}])
+    assert reused["id"] == task["id"]
+    client.delete(f"/api/{other_id}/tasks/{reused['id']}", headers=other_headers)
+
+    assert client.get(url, params={"since": token}, headers=headers).json()["deleted"] == [task["id"]]
+
+
+def test_tombstones_are_rekeyed_by_owner_on_migration():
+    from sqlalchemy import create_engine, inspect
+    from sqlalchemy.pool import StaticPool
+    from database import Base
+    from migrations import MIGRATIONS, run_migrations
+
+    legacy_engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=legacy_engine)
+    with legacy_engine.begin() as conn:
+        # task_tombstones as created before migration 7
+        conn.execute(text("DROP TABLE task_tombstones"))
+        conn.execute(text(
+            "CREATE TABLE task_tombstones (task_id INTEGER PRIMARY KEY, owner_id INTEGER NOT NULL, "
+            "change_seq INTEGER NOT NULL, deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        conn.execute(text("CREATE INDEX ix_task_tombstones_owner_change_seq ON task_tombstones (owner_id, change_seq)"))
+        conn.execute(text("INSERT INTO task_tombstones (task_id, owner_id, change_seq) VALUES (7, 1, 3)"))
+        conn.execute(text("CREATE TABLE schema_migrations (version INTEGER PRIMARY KEY, name VARCHAR NOT NULL)"))
+        for version, name, _ in MIGRATIONS[:6]:
+            conn.execute(text("INSERT INTO schema_migrations VALUES (:version, :name)"), {"version": version, "name": name})
+
+    run_migrations(legacy_engine)
+
+    inspector = inspect(legacy_engine)
+    assert inspector.get_pk_constraint("task_tombstones")["constrained_columns"] == ["owner_id", "task_id"]
+    assert {index["name"] for index in inspector.get_indexes("task_tombstones")} >= {"ix_task_tombstones_owner_change_seq"}
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text("SELECT owner_id, task_id, change_seq FROM task_tombstones")).all() == [(1, 7, 3)]
+        assert "task_tombstones_old" not in inspect(conn).get_table_names()
+
+
+def test_changes_after_compaction_require_a_full_sync(client, make_user):
+    user_id, headers = make_user("compactuser_unique12")
+    task = create_tasks(client, user_id, headers, [{"title": "Short lived"}])[0]
+    url = f"/api/{user_id}/tasks/changes"
+    token = client.get(url, headers=headers).json()["sync_token"]
+    client.delete(f"/api/{user_id}/tasks/{task['id']}", headers=headers)
+
+    db = TestingSessionLocal()
+    try:
+        assert compact_tombstones(db, older_than=datetime.now(timezone.utc) + timedelta(days=1)) >= 1
+    finally:
+        db.close()
+
+    assert client.get(url, params={"since": token}, headers=headers).status_code == 410
+    assert client.get(url, params={"since": 10**6}, headers=headers).status_code == 410
+    assert client.get(url, headers=headers).json()["changed"] == []
+
+
+def test_list_rows_match_the_task_schema(client, make_user):
+    user_id, headers = make_user("fastlistuser_unique16")
+    created = create_tasks(client, user_id, headers, [
+        {"title": "Dated", "due_date": "2030-01-02", "tags": ["b", "a"], "priority": "high"},
+        {"title": "Plain"},
+    ])
+
+    listed = client.get(f"/api/{user_id}/tasks", headers=headers).json()
+    page = client.get(f"/api/{user_id}/tasks", params={"limit": 1}, headers=headers).json()
+    details = [client.get(f"/api/{user_id}/tasks/{task['id']}", headers=headers).json() for task in created]
+
+    assert listed == details
+    assert page == details[:1]
+    assert listed[0]["tags"] == ["b", "a"]
+    assert listed[0]["due_date"] == "2030-01-02T00:00:00"
+
+
+def test_due_date_range_and_overdue_filters(client, make_user):
+    user_id, headers = make_user("calendaruser_unique19")
+    january, february, past, done = create_tasks(client, user_id, headers, [
+        {"title": "January", "due_date": "2030-01-31T23:00:00"},
+        {"title": "February", "due_date": "02/01/2030"},
+        {"title": "Past", "due_date": "2001-05-01"},
+        {"title": "Past but done", "due_date": "2001-05-02", "completed": True},
+    ])
+    create_tasks(client, user_id, headers, [{"title": "Undated"}])
+
+    def filtered(params):
+        response = client.get(f"/api/{user_id}/tasks", params=params, headers=headers)
+        assert response.status_code == 200
+        return [task["id"] for task in response.json()]
+
+    assert filtered({"due_from": "2030-01-01", "due_to": "2030-02-01"}) == [january["id"]]
+    assert filtered({"due_from": "2030-02-01"}) == [february["id"]]
+    assert filtered({"overdue": True}) == [past["id"]]
+
+
+def test_due_dates_are_normalized_on_update(client, make_user):
+    user_id, headers = make_user("dueupdateuser_unique20")
+    task = create_tasks(client, user_id, headers, [{"title": "Moves"}])[0]
+    url = f"/api/{user_id}/tasks/{task['id']}"
+
+    moved = client.put(url, json={"due_date": "2030-03-04T12:00:00+02:00"}, headers=headers)
+    assert moved.status_code == 200
+    assert moved.json()["due_date"] == "2030-03-04T10:00:00"
+
+    # As sent by JavaScript's toISOString()
+    for due_date in ("2030-01-01T10:00:00Z", "2030-01-01T10:00:00.000Z"):
+        assert client.put(url, json={"due_date": due_date}, headers=headers).json()["due_date"] == "2030-01-01T10:00:00"
+    listed = client.get(f"/api/{user_id}/tasks", params={"due_from": "2030-01-01T09:00:00Z", "due_to": "2030-01-01T11:00:00.000Z"}, headers=headers)
+    assert [row["id"] for row in listed.json()] == [task["id"]]
+
+    assert client.put(url, json={"due_date": "not a date"}, headers=headers).status_code == 422
+    assert client.put(url, json={"due_date": ""}, headers=headers).json()["due_date"] is None
+
+
+def test_task_stats(client, make_user):
+    user_id, headers = make_user("statsuser_unique21")
+    create_tasks(client, user_id, headers, [
+        {"title": "High done", "priority": "high", "completed": True},
+        {"title": "High open", "priority": "high", "due_date": "2001-01-01"},
+        {"title": "Low open", "priority": "low", "due_date": "2099-01-01"},
+        {"title": "Old but done", "priority": "low", "due_date": "2001-01-01", "completed": True},
+    ])
+
+    response = client.get(f"/api/{user_id}/tasks/stats", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "total": 4,
+        "completed": 2,
+        "pending": 2,
+        "overdue": 1,
+        "by_priority": {"high": 2, "low": 2},
+    }
+
+
+def test_sorted_pages_follow_each_order(client, make_user):
+    user_id, headers = make_user("sortuser_unique22")
+    tasks = create_tasks(client, user_id, headers, [
+        {"title": "banana", "priority": "high", "due_date": "2030-01-02"},
+        {"title": "apple", "priority": "low"},
+        {"title": "cherry", "priority": "medium", "due_date": "2030-01-01"},
+        {"title": "apple", "priority": "urgent", "due_date": "2030-01-02"},
+        {"title": "date", "priority": "high"},
+    ])
+    rank = {"low": 0, "medium": 1, "high": 2}
+    keys = {
+        "created_at": lambda task: (0, task["id"]),
+        "title": lambda task: (0, task["title"]),
+        "priority": lambda task: (task["priority"] in rank, rank.get(task["priority"], 0)),
+        "due_date": lambda task: (task["due_date"] is not None, task["due_date"] or ""),
+    }
+
+    for sort, key in keys.items():
+        for order in ("asc", "desc"):
+            # NULLs (False) sort first ascending; ids break ties in the same direction
+            expected = sorted(tasks, key=lambda task: (key(task), task["id"]), reverse=order == "desc")
+            pages = fetch_all_pages(client, f"/api/{user_id}/tasks", headers, {"sort": sort, "order": order, "limit": 2})
+            assert [task["id"] for page in pages for task in page] == [task["id"] for task in expected], (sort, order)
+
+
+def test_cursor_cannot_switch_sort_order(client, make_user):
+    user_id, headers = make_user("sortcursoruser_unique23")
+    create_tasks(client, user_id, headers, [{"title": f"Task {i}"} for i in range(3)])
+    url = f"/api/{user_id}/tasks"
+    cursor = client.get(url, params={"sort": "title", "limit": 1}, headers=headers).headers["X-Next-Cursor"]
+
+    response = client.get(url, params={"sort": "title", "order": "desc", "cursor": cursor}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_fields_restrict_list_and_detail(client, make_user):
+    user_id, headers = make_user("fieldsuser_unique25")
+    task = create_tasks(client, user_id, headers, [
+        {"title": "Slim", "description": "long text " * 100, "tags": ["x"], "priority": "high"}
+    ])[0]
+    url = f"/api/{user_id}/tasks"
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        listed = client.get(url, params={"fields": "title,completed"}, headers=headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert listed == [{"title": "Slim", "completed": False, "id": task["id"]}]
+    task_queries = [statement for statement in statements if "FROM tasks" in statement]
+    assert task_queries and all("description" not in statement for statement in task_queries)
+    assert not any("FROM task_tags" in statement for statement in statements)
+
+    detail = client.get(f"{url}/{task['id']}", params={"fields": "tags, priority"}, headers=headers)
+    assert detail.json() == {"priority": "high", "tags": ["x"], "id": task["id"]}
+
+    assert client.get(url, params={"fields": "title,secret"}, headers=headers).status_code == 400
+    assert client.get(f"{url}/{10**9}", params={"fields": "title"}, headers=headers).status_code == 404
+
+
+def test_projected_reads_document_the_task_shape(client):
+    paths = client.get("/openapi.json").json()["paths"]
+
+    listed = paths["/api/{user_id}/tasks"]["get"]["responses"]
+    detail = paths["/api/{user_id}/tasks/{task_id}"]["get"]["responses"]
+    assert listed["200"]["content"]["application/json"]["schema"]["items"] == {"$ref": "#/components/schemas/Task"}
+    assert "X-Next-Cursor" in listed["200"]["headers"]
+    assert detail["200"]["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/Task"}
+    assert "304" in listed and "304" in detail
+
+
+def test_writes_return_the_stored_task_and_leave_others_alone(client, make_user):
+    user_id, headers = make_user("writeuser_unique29")
+    other_id, other_headers = make_user("writeother_unique30")
+    task, = create_tasks(client, user_id, headers, [{"title": "Write", "tags": ["b", "a"], "priority": "high"}])
+    url = f"/api/{user_id}/tasks/{task['id']}"
+    assert task["created_at"] is not None and task["completed"] is False
+
+    # Tags not in the update come back from the stored rows, in order
+    updated = client.put(url, json={"description": "Details"}, headers=headers).json()
+    assert updated["tags"] == ["b", "a"] and updated["description"] == "Details"
+    assert updated["updated_at"] is not None
+
+    toggled = client.patch(f"{url}/toggle", headers=headers).json()
+    assert toggled["completed"] is True and toggled["tags"] == ["b", "a"]
+    assert client.patch(f"{url}/toggle", headers=headers).json()["completed"] is False
+    stored = client.get(url, headers=headers).json()
+    assert stored == {**toggled, "completed": False, "updated_at": stored["updated_at"]}
+
+    # Someone else's task id is not found, and nothing of theirs changes
+    version = client.get(f"/api/{other_id}/tasks/changes", headers=other_headers).json()["sync_token"]
+    for response in (
+        client.put(f"/api/{other_id}/tasks/{task['id']}", json={"title": "Stolen"}, headers=other_headers),
+        client.patch(f"/api/{other_id}/tasks/{task['id']}/toggle", headers=other_headers),
+        client.delete(f"/api/{other_id}/tasks/{task['id']}", headers=other_headers),
+    ):
+        assert response.status_code == 404
+    assert client.get(f"/api/{other_id}/tasks/changes", headers=other_headers).json()["sync_token"] == version
+    assert client.get(url, headers=headers).json()["title"] == "Write"
+
+    assert client.delete(url, headers=headers).status_code == 200
+    assert client.get(url, headers=headers).status_code == 404
+    with TestingSessionLocal() as db:
+        assert db.execute(text("SELECT count(*) FROM task_tags WHERE task_id = :id"), {"id": task["id"]}).scalar() == 0
+
+
+def test_filtered_lists_only_read_their_own_tags(client, make_user, monkeypatch):
+    import tasks_router
+
+    user_id, headers = make_user("tagloaduser_unique39")
+    tasks = create_tasks(client, user_id, headers, [
+        {"title": f"Tagged {i}", "priority": "high" if i < 3 else "low", "tags": [f"t{i}"]} for i in range(8)
+    ])
+    monkeypatch.setattr(tasks_router, "_TAG_QUERY_CHUNK", 2)
+
+    queries = []
+    listener = lambda conn, cursor, statement, parameters, *args: queries.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        listed = client.get(f"/api/{user_id}/tasks", params={"priority": "high"}, headers=headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert [task["tags"] for task in listed] == [["t0"], ["t1"], ["t2"]]
+    tag_queries = [parameters for statement, parameters in queries if "FROM task_tags" in statement]
+    # Two chunks, covering the three listed tasks and nothing else
+    assert len(tag_queries) == 2
+    high_ids = {task["id"] for task in tasks[:3]}
+    assert {value for parameters in tag_queries for value in parameters} == high_ids
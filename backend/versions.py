@@ -0,0 +1,93 @@
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Request
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import TaskTombstone, TaskVersion
+
+# Deleted tasks are reported to delta sync clients for this long; clients
+# that last synced before a compaction must do a full resync
+TOMBSTONE_RETENTION_DAYS = float(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+TOMBSTONE_COMPACT_INTERVAL = float(os.getenv("TOMBSTONE_COMPACT_INTERVAL_SECONDS", "3600"))
+
+
+def _insert_for(db: Session):
+    return (postgresql if db.get_bind().dialect.name == "postgresql" else sqlite).insert
+
+
+def bump_task_version(db: Session, user_id: int) -> int:
+    # Atomic upsert, so concurrent first writes can't race on the insert
+    statement = _insert_for(db)(TaskVersion).values(user_id=user_id, version=1).on_conflict_do_update(
+        index_elements=[TaskVersion.user_id],
+        set_={"version": TaskVersion.version + 1}
+    ).returning(TaskVersion.version)
+    return db.execute(statement).scalar_one()
+
+
+def record_task_changes(db: Session, user_id: int, changed=(), deleted_ids=()) -> int:
+    # Call before committing a write: bumps the user's version, stamps the
+    # changed tasks with it and leaves a tombstone for each deleted one
+    version = bump_task_version(db, user_id)
+    for task in changed:
+        task.change_seq = version
+    if deleted_ids:
+        # Ids can be reused after a delete, so a tombstone may already exist
+        statement = _insert_for(db)(TaskTombstone).values([
+            {"task_id": task_id, "owner_id": user_id, "change_seq": version}
+            for task_id in deleted_ids
+        ])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[TaskTombstone.owner_id, TaskTombstone.task_id],
+            set_={
+                "change_seq": statement.excluded.change_seq,
+                "deleted_at": func.now(),
+            }
+        ))
+    return version
+
+
+def compact_tombstones(db: Session, older_than: datetime = None) -> int:
+    # Drop old tombstones, remembering per user the newest version dropped
+    if older_than is None:
+        older_than = datetime.now(timezone.utc) - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    expired = db.query(TaskTombstone.owner_id, func.max(TaskTombstone.change_seq)).filter(
+        TaskTombstone.deleted_at < older_than
+    ).group_by(TaskTombstone.owner_id).all()
+    for user_id, change_seq in expired:
+        db.query(TaskVersion).filter(
+            TaskVersion.user_id == user_id,
+            TaskVersion.compacted_seq < change_seq
+        ).update({TaskVersion.compacted_seq: change_seq}, synchronize_session=False)
+    removed = db.query(TaskTombstone).filter(
+        TaskTombstone.deleted_at < older_than
+    ).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+def get_task_version(db: Session, user_id: int) -> int:
+    # Users who never wrote a task have no row yet
+    version = db.query(TaskVersion.version).filter(TaskVersion.user_id == user_id).scalar()
+    return version or 0
+
+
+def make_etag(version: int, request: Request) -> str:
+    # The same version renders differently per path and query string. Weak,
+    # because compression may change the bytes on the wire.
+    target = f"{request.url.path}?{request.url.query}"
+    representation = hashlib.sha256(target.encode()).hexdigest()[:16]
+    return f'W/"{version}-{representation}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes on either side
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates